@@ -24,6 +24,7 @@ from jedi.inference.imports import load_module_from_path, \
     load_namespace_from_path, iter_module_names
 from jedi.inference.sys_path import discover_buildout_paths
 from jedi.inference.cache import inference_state_as_method_param_cache
+from jedi.inference.gitignore import FolderExcludes
 from jedi.inference.references import recurse_find_python_folders_and_files, search_in_file_ios
 from jedi.file_io import FolderIO
 from jedi.common.utils import traverse_parents
@@ -106,6 +107,7 @@ class Project(object):
         data = dict(self.__dict__)
         data.pop('_environment', None)
         data.pop('_django', None)  # TODO make django setting public?
+        data.pop('_folder_excludes', None)
         data = {k.lstrip('_'): v for k, v in data.items()}
 
         # TODO when dropping Python 2 use pathlib.Path.mkdir(parents=True, exist_ok=True)
@@ -135,9 +137,13 @@ class Project(object):
         :param smart_sys_path: If this is enabled (default), adds paths from
             local directories. Otherwise you will have to rely on your packages
             being properly configured on the ``sys.path``.
+        :param folder_exclude_patterns: list of str. Folders matching these
+            ``fnmatch`` patterns (of names, or of paths if they contain a
+            path separator) are not searched.
         """
         def py2_comp(path, environment_path=None, load_unsafe_extensions=False,
-                     sys_path=None, added_sys_path=(), smart_sys_path=True):
+                     sys_path=None, added_sys_path=(), smart_sys_path=True,
+                     folder_exclude_patterns=()):
             self._path = os.path.abspath(path)
 
             self._environment_path = environment_path
@@ -145,11 +151,18 @@ class Project(object):
             self._smart_sys_path = smart_sys_path
             self._load_unsafe_extensions = load_unsafe_extensions
             self._django = False
+            self._folder_exclude_patterns = list(folder_exclude_patterns)
+            self._folder_excludes = None
             self.added_sys_path = list(added_sys_path)
             """The sys path that is going to be added at the end of the """
 
         py2_comp(path, **kwargs)
 
+    def _get_folder_excludes(self):
+        if self._folder_excludes is None:
+            self._folder_excludes = FolderExcludes(self._folder_exclude_patterns)
+        return self._folder_excludes
+
     @inference_state_as_method_param_cache()
     def _get_base_sys_path(self, inference_state):
         # The sys path has not been set explicitly.
@@ -267,7 +280,8 @@ class Project(object):
         name = wanted_names[0]
         stub_folder_name = name + '-stubs'
 
-        ios = recurse_find_python_folders_and_files(FolderIO(self._path))
+        ios = recurse_find_python_folders_and_files(
+            FolderIO(self._path), folder_excludes=self._get_folder_excludes())
         file_ios = []
 
         # 1. Search for modules in the current project
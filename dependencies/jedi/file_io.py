@@ -76,7 +76,18 @@ class ZipFileIO(file_io.KnownContentFileIO, FileIOFolderMixin):
 
 
 class FileIO(file_io.FileIO, FileIOFolderMixin):
-    pass
+    def __init__(self, path, dir_entry=None):
+        super(FileIO, self).__init__(path)
+        self._dir_entry = dir_entry
+
+    def stat(self):
+        """
+        Returns ``os.stat`` of the file. Files found by walking folders reuse
+        the stat of their directory entry, which comes for free on Windows.
+        """
+        if self._dir_entry is not None:
+            return self._dir_entry.stat()
+        return os.stat(self.path)
 
 
 class KnownContentFileIO(file_io.KnownContentFileIO, FileIOFolderMixin):
@@ -0,0 +1,192 @@
+"""
+Rules pruning walks of project folders: ``.gitignore`` files (with globs,
+negation, anchored patterns and nested files) and folder exclude patterns.
+Both are compiled to regular expressions once.
+"""
+import os
+import re
+import fnmatch
+import threading
+
+_gitignores = {}  # path -> (mtime, GitIgnore)
+_gitignores_lock = threading.Lock()
+
+
+class GitIgnore(object):
+    """
+    The rules of a ``.gitignore`` file, they apply to paths below ``base``.
+    """
+    def __init__(self, base, lines):
+        self.base = base
+        self._rules = []  # (regex, is_negated, is_dir_only)
+        for line in lines:
+            rule = _parse_line(line)
+            if rule is not None:
+                self._rules.append(rule)
+        # Tells quickly, if any rule may match at all, which is rare.
+        self._any = re.compile('|'.join(
+            '(?:%s)' % regex.pattern for regex, _, _ in self._rules
+        )) if self._rules else None
+
+    def match(self, path, is_dir):
+        """
+        Returns True if the path is ignored, False if a negated rule includes
+        it again and None if no rule matches it.
+        """
+        if self._any is None:
+            return None
+        relative = path[len(self.base) + 1:]
+        if os.path.sep != '/':
+            relative = relative.replace(os.path.sep, '/')
+        if not self._any.match(relative):
+            return None
+        # The last matching rule wins.
+        for regex, is_negated, is_dir_only in reversed(self._rules):
+            if (is_dir or not is_dir_only) and regex.match(relative):
+                return not is_negated
+        return None
+
+
+def is_ignored(gitignores, path, is_dir):
+    """
+    :param gitignores: ``GitIgnore`` objects of folders above the path, the
+        nearest (which overrides others) last.
+    """
+    for gitignore in reversed(gitignores):
+        ignored = gitignore.match(path, is_dir)
+        if ignored is not None:
+            return ignored
+    return False
+
+
+def load_gitignore(path):
+    """
+    Returns the compiled ``.gitignore`` file, None if there's no such file.
+    Files are compiled again only if they changed.
+    """
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+    with _gitignores_lock:
+        cached = _gitignores.get(path)
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    try:
+        with open(path, 'rb') as f:
+            lines = f.read().decode('utf-8', 'ignore').splitlines()
+    except (IOError, OSError):
+        return None
+    gitignore = GitIgnore(os.path.dirname(path), lines)
+    with _gitignores_lock:
+        _gitignores[path] = mtime, gitignore
+    return gitignore
+
+
+def get_parent_gitignores(folder_path):
+    """
+    Returns ``GitIgnore`` objects of the folders above, up to the root of the
+    git repository, which apply to the folder. Nothing if it isn't in a
+    repository.
+    """
+    gitignores = []
+    path = os.path.dirname(folder_path)
+    while True:
+        gitignore = load_gitignore(os.path.join(path, '.gitignore'))
+        if gitignore is not None:
+            gitignores.append(gitignore)
+        if os.path.exists(os.path.join(path, '.git')):
+            return tuple(reversed(gitignores))
+        parent = os.path.dirname(path)
+        if parent == path:
+            return ()
+        path = parent
+
+
+class FolderExcludes(object):
+    """
+    Folder exclude patterns like Sublime Text's ``folder_exclude_patterns``:
+    ``fnmatch`` patterns of folder names, or of whole paths if they contain a
+    path separator.
+    """
+    def __init__(self, patterns):
+        patterns = list(patterns)
+        self.patterns = patterns
+        name_patterns = [p for p in patterns if '/' not in p and os.path.sep not in p]
+        path_patterns = [p for p in patterns if p not in name_patterns]
+        self._names = self._compile(name_patterns)
+        self._paths = self._compile(path_patterns)
+
+    @staticmethod
+    def _compile(patterns):
+        if not patterns:
+            return None
+        return re.compile('|'.join(
+            '(?:%s)' % fnmatch.translate(os.path.normcase(p)) for p in patterns
+        ))
+
+    def match(self, path):
+        path = os.path.normcase(path)
+        if self._names is not None and self._names.match(os.path.basename(path)):
+            return True
+        return self._paths is not None and bool(self._paths.match(path))
+
+
+def _parse_line(line):
+    """
+    Returns ``(regex, is_negated, is_dir_only)`` of a ``.gitignore`` line, the
+    regex matches paths relative to the folder of the file.
+    """
+    # Trailing spaces are ignored, unless they are escaped.
+    line = re.sub(r'(?<!\\) +$', '', line.rstrip('\r\n'))
+    if not line or line.startswith('#'):
+        return None
+    is_negated = line.startswith('!')
+    if is_negated:
+        line = line[1:]
+    is_dir_only = line.endswith('/')
+    line = line.rstrip('/')
+    if not line:
+        return None
+    # Patterns with a slash (not at the end) are relative to the folder,
+    # others match names at any level.
+    is_anchored = '/' in line
+    line = line.lstrip('/')
+
+    regex = [] if is_anchored else ['(?:.*/)?']
+    i = 0
+    length = len(line)
+    while i < length:
+        c = line[i]
+        if line.startswith('**/', i) and (i == 0 or line[i - 1] == '/'):
+            regex.append('(?:.*/)?')
+            i += 3
+            continue
+        if line.startswith('**', i) and i + 2 == length \
+                and (i == 0 or line[i - 1] == '/'):
+            regex.append('.*')
+            i += 2
+            continue
+        if c == '*':
+            regex.append('[^/]*')
+        elif c == '?':
+            regex.append('[^/]')
+        elif c == '[':
+            end = line.find(']', i + 2)
+            if end == -1:
+                regex.append(re.escape(c))
+            else:
+                chars = line[i + 1:end]
+                if chars[0] in '!^':
+                    chars = '^' + chars[1:]
+                regex.append('[%s]' % chars.replace('\\', '\\\\'))
+                i = end
+        elif c == '\\' and i + 1 < length:
+            i += 1
+            regex.append(re.escape(line[i]))
+        else:
+            regex.append(re.escape(c))
+        i += 1
+    regex.append('$')
+    return re.compile(''.join(regex)), is_negated, is_dir_only
@@ -0,0 +1,206 @@
+"""
+A persistent index of identifiers used in files, that tells which files
+contain a name without reading them.
+
+For every identifier there's a posting list of ids of files, it's used in.
+A file gets a new id every time it changes (its modification time or size
+differs from the indexed one), so ids of changed files simply never match
+again and are dropped from posting lists once in a while.
+"""
+import os
+import re
+import time
+import pickle
+import hashlib
+import threading
+from array import array
+
+from parso import python_bytes_to_unicode
+
+from jedi import settings
+from jedi.debug import dbg
+from jedi.inference.parallel import map_in_threads
+
+# Words are a superset of identifiers and the same thing ``\bname\b`` finds.
+_WORD = re.compile(r'\w+')
+
+_INDEX_VERSION = 1
+
+_SAVE_DELAY = 10
+"""
+Seconds to wait before the changed index is written, searches usually come
+in bursts.
+"""
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_identifier_index(project_path):
+    with _indexes_lock:
+        try:
+            return _indexes[project_path]
+        except KeyError:
+            index = _indexes[project_path] = IdentifierIndex(project_path)
+            return index
+
+
+class IdentifierIndex(object):
+    def __init__(self, project_path, cache_path=None):
+        self.project_path = project_path
+        self.cache_path = cache_path or _get_cache_path(project_path)
+        self._lock = threading.Lock()
+        self._files = None  # path -> (mtime, size, file id)
+        self._postings = None  # identifier -> array of file ids
+        self._next_id = 0
+        self._stale_count = 0
+        self._save_timer = None
+
+    def search(self, file_io_iterator, name):
+        """
+        Yields file ios of files containing the name together with their
+        code. Only files that are not indexed yet or changed are read to
+        find out. Files are read in threads, but the order is kept.
+        """
+        with self._lock:
+            if self._files is None:
+                self._load()
+            file_ids = frozenset(self._postings.get(name, ()))
+
+        try:
+            for file_io, code in map_in_threads(
+                    lambda candidate: (candidate[0], self._read(candidate, name)),
+                    self._iter_candidates(file_io_iterator, file_ids)):
+                if code is not None:
+                    yield file_io, code
+        finally:
+            self._schedule_save()
+
+    def _iter_candidates(self, file_io_iterator, file_ids):
+        """
+        Yields file ios with their stat of files, that are not indexed,
+        changed or contain the name according to the index (then ``True``).
+        """
+        for file_io in file_io_iterator:
+            try:
+                stat = _stat(file_io)
+            except OSError:
+                continue
+            indexed = self._files.get(file_io.path)
+            if indexed is None \
+                    or indexed[:2] != (stat.st_mtime, stat.st_size):
+                yield file_io, stat, False
+            elif indexed[2] in file_ids:
+                yield file_io, stat, True
+
+    def _read(self, candidate, name):
+        """Returns the code of the file if it contains the name."""
+        file_io, stat, is_indexed = candidate
+        code = _read(file_io)
+        if code is None or is_indexed:
+            return code
+        identifiers = set(_WORD.findall(code))
+        self._add(file_io.path, stat, identifiers)
+        if name not in identifiers:
+            return None
+        return code
+
+    def _add(self, path, stat, identifiers):
+        with self._lock:
+            if path in self._files:
+                self._stale_count += 1
+            file_id = self._next_id
+            self._next_id += 1
+            self._files[path] = stat.st_mtime, stat.st_size, file_id
+            for identifier in identifiers:
+                try:
+                    self._postings[identifier].append(file_id)
+                except KeyError:
+                    self._postings[identifier] = array('I', [file_id])
+            if self._stale_count > len(self._files):
+                self._compact()
+
+    def _compact(self):
+        """Removes ids of changed files from posting lists."""
+        current = frozenset(indexed[2] for indexed in self._files.values())
+        postings = {}
+        for identifier, file_ids in self._postings.items():
+            file_ids = array('I', (i for i in file_ids if i in current))
+            if file_ids:
+                postings[identifier] = file_ids
+        self._postings = postings
+        self._stale_count = 0
+
+    def _load(self):
+        self._files = {}
+        self._postings = {}
+        try:
+            with open(self.cache_path, 'rb') as f:
+                data = pickle.load(f)
+        except (IOError, OSError):
+            return
+        except Exception as e:
+            dbg('Failed to load identifier index %s: %s', self.cache_path, e)
+            return
+        version, project_path, files, postings, next_id, stale_count = data
+        if version == _INDEX_VERSION and project_path == self.project_path:
+            self._files = files
+            self._postings = postings
+            self._next_id = next_id
+            self._stale_count = stale_count
+
+    def _schedule_save(self):
+        with self._lock:
+            if self._save_timer is not None:
+                return
+            self._save_timer = threading.Timer(_SAVE_DELAY, self._save)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save(self):
+        started = time.time()
+        with self._lock:
+            self._save_timer = None
+            data = pickle.dumps((
+                _INDEX_VERSION,
+                self.project_path,
+                self._files,
+                self._postings,
+                self._next_id,
+                self._stale_count,
+            ), pickle.HIGHEST_PROTOCOL)
+        try:
+            folder = os.path.dirname(self.cache_path)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            temporary = '%s.%s' % (self.cache_path, os.getpid())
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, self.cache_path)
+        except OSError as e:
+            dbg('Failed to save identifier index %s: %s', self.cache_path, e)
+            return
+        dbg('Saved identifier index of %s files in %.3fs',
+            len(self._files), time.time() - started)
+
+
+def _stat(file_io):
+    try:
+        # Files found by walking folders may know their stat already.
+        stat = file_io.stat
+    except AttributeError:
+        return os.stat(file_io.path)
+    return stat()
+
+
+def _read(file_io):
+    try:
+        code = file_io.read()
+    except (IOError, OSError):
+        return None
+    return python_bytes_to_unicode(code, errors='replace')
+
+
+def _get_cache_path(project_path):
+    key = hashlib.sha1(project_path.encode('utf-8', 'replace')).hexdigest()
+    return os.path.join(settings.cache_directory, 'identifiers', key + '.pickle')
@@ -0,0 +1,178 @@
+"""
+Files are read in threads and parsed in processes, when references are
+searched in many of them.
+
+Modules parsed in other processes get to this one through parso's file
+system cache: loading a pickled module is about ten times faster than
+parsing it.
+
+Processes are spawned rather than forked, a forked child could inherit a lock
+held by another thread and hang. Results not ready in time are computed in
+this process instead.
+"""
+import os
+import threading
+import multiprocessing
+from collections import deque
+
+import parso
+from parso.cache import parser_cache
+
+from jedi import settings
+from jedi.debug import dbg
+
+try:
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, \
+        TimeoutError
+except ImportError:
+    # Python 2
+    ThreadPoolExecutor = ProcessPoolExecutor = None
+
+_THREADS = 8
+_THREAD_WINDOW = 64
+"""
+How many files are read ahead, reading stops soon after the caller does.
+"""
+_READ_TIMEOUT = 10
+"""
+Seconds to wait for a file read in a thread, before reading it again here.
+"""
+_PARSE_TIMEOUT = 30
+"""
+Seconds to wait for each file parsed in a process, before the pool is shut
+down and files are parsed in this process.
+"""
+
+_lock = threading.Lock()
+_thread_pool = None
+_process_pool = None
+_process_count = 0
+
+
+def map_in_threads(func, iterable):
+    """
+    Like ``map``, but ``func`` is called in a thread pool. Results are in the
+    order of ``iterable``, which is consumed lazily.
+    """
+    pool = _get_thread_pool()
+    if pool is None:
+        for item in iterable:
+            yield func(item)
+        return
+
+    def get_result(future, item):
+        try:
+            return future.result(timeout=_READ_TIMEOUT)
+        except TimeoutError:
+            dbg('Reading %s in a thread timed out', item)
+            return func(item)
+
+    futures = deque()
+    try:
+        for item in iterable:
+            futures.append((pool.submit(func, item), item))
+            if len(futures) >= _THREAD_WINDOW:
+                yield get_result(*futures.popleft())
+        while futures:
+            yield get_result(*futures.popleft())
+    finally:
+        for future, _ in futures:
+            future.cancel()
+
+
+def parse_in_processes(grammar, paths):
+    """
+    Parses the files in the pool of :data:`jedi.settings.parse_processes`
+    processes and saves them to parso's cache, unless they are cached
+    already. Returns False if there are no processes (anymore).
+    """
+    paths = [path for path in paths if not _is_cached(grammar, path)]
+    if len(paths) < 2:
+        # Sending a single file to another process doesn't save anything.
+        return True
+    pool = _get_process_pool()
+    if pool is None:
+        return False
+
+    version = '%s.%s' % grammar.version_info[:2]
+    futures = [
+        pool.submit(_parse, version, path, settings.cache_directory)
+        for path in paths
+    ]
+    for path, future in zip(paths, futures):
+        try:
+            future.result(timeout=_PARSE_TIMEOUT)
+        except Exception as e:
+            dbg('Failed to parse %s in a process: %r', path, e)
+            # TimeoutError is an OSError since Python 3.11.
+            if isinstance(e, TimeoutError) \
+                    or not isinstance(e, (IOError, OSError)):
+                # The pool is broken or stuck, files are parsed in this
+                # process from now on.
+                for future in futures:
+                    future.cancel()
+                _shutdown_process_pool()
+                return False
+    return True
+
+
+def _parse(version, path, cache_path):
+    parso.load_grammar(version=version).parse(
+        path=path,
+        cache=True,
+        cache_path=cache_path,
+    )
+    # Modules are read from the file system cache by the parent process.
+    parser_cache.clear()
+
+
+def _is_cached(grammar, path):
+    try:
+        item = parser_cache[grammar._hashed][path]
+        return item.change_time >= os.path.getmtime(path)
+    except (KeyError, OSError):
+        return False
+
+
+def _get_thread_pool():
+    global _thread_pool
+    if ThreadPoolExecutor is None:
+        return None
+    with _lock:
+        if _thread_pool is None:
+            _thread_pool = ThreadPoolExecutor(_THREADS)
+        return _thread_pool
+
+
+def _get_process_pool():
+    global _process_pool, _process_count
+    if ProcessPoolExecutor is None:
+        return None
+    with _lock:
+        if _process_count != settings.parse_processes:
+            if _process_pool is not None:
+                _process_pool.shutdown(wait=False)
+            _process_count = settings.parse_processes
+            _process_pool = None
+            if _process_count > 0:
+                try:
+                    _process_pool = ProcessPoolExecutor(
+                        _process_count,
+                        mp_context=multiprocessing.get_context('spawn'),
+                    )
+                except TypeError:
+                    # Before Python 3.7 the pool can only fork.
+                    dbg('Files are parsed in this process, processes '
+                        'could only be forked')
+        return _process_pool
+
+
+def _shutdown_process_pool():
+    global _process_pool
+    with _lock:
+        if _process_pool is not None:
+            # Processes might be stuck, they would keep this one from exiting.
+            for process in list((_process_pool._processes or {}).values()):
+                process.terminate()
+            _process_pool.shutdown(wait=False)
+            _process_pool = None
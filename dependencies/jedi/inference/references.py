@@ -1,23 +1,20 @@
 import os
-import re
-
-from parso import python_bytes_to_unicode
+from itertools import islice
 
+from jedi import settings
 from jedi.debug import dbg
-from jedi.file_io import KnownContentFileIO
+from jedi._compatibility import scandir
+from jedi.file_io import FileIO, FolderIO, KnownContentFileIO
+from jedi.inference.gitignore import get_parent_gitignores, is_ignored, \
+    load_gitignore
+from jedi.inference.identifiers import get_identifier_index
+from jedi.inference.parallel import parse_in_processes
 from jedi.inference.imports import SubModuleName, load_module_from_path
 from jedi.inference.filters import ParserTreeFilter
 from jedi.inference.gradual.conversion import convert_names
 
 _IGNORE_FOLDERS = ('.tox', '.venv', 'venv', '__pycache__')
 
-_OPENED_FILE_LIMIT = 2000
-"""
-Stats from a 2016 Lenovo Notebook running Linux:
-With os.walk, it takes about 10s to scan 11'000 files (without filesystem
-caching). Once cached it only takes 5s. So it is expected that reading all
-those files might take a few seconds, but not a lot more.
-"""
 _PARSED_FILE_LIMIT = 30
 """
 For now we keep the amount of parsed files really low, since parsing might take
@@ -113,7 +110,22 @@ def _find_global_variables(names, search_name):
                     yield n
 
 
-def find_references(module_context, tree_name):
+def find_references(module_context, tree_name, parse_limit=None):
+    return [
+        name
+        for names in iter_references(module_context, tree_name, parse_limit)
+        for name in names
+    ]
+
+
+def iter_references(module_context, tree_name, parse_limit=None):
+    """
+    Like :func:`find_references`, but names are yielded as soon as a module is
+    searched, in lists of names that were not yielded before.
+
+    :param parse_limit: How many other modules containing the name may be
+        parsed, ``_PARSED_FILE_LIMIT`` if None.
+    """
     inf = module_context.inference_state
     search_name = tree_name.value
 
@@ -126,6 +138,8 @@ def find_references(module_context, tree_name):
         inf.flow_analysis_enabled = True
 
     found_names_dct = _dictionarize(found_names)
+    yielded = set(found_names_dct)
+    yield list(found_names_dct.values())
 
     module_contexts = set(d.get_root_context() for d in found_names)
     module_contexts = [module_context] + [m for m in module_contexts if m != module_context]
@@ -137,6 +151,7 @@ def find_references(module_context, tree_name):
             inf,
             module_contexts,
             search_name,
+            parse_limit=parse_limit,
         )
 
     non_matching_reference_maps = {}
@@ -157,17 +172,14 @@ def find_references(module_context, tree_name):
             else:
                 for name in new:
                     non_matching_reference_maps.setdefault(name, []).append(new)
-    return found_names_dct.values()
 
+        names = [n for tn, n in found_names_dct.items() if tn not in yielded]
+        if names:
+            yielded.update(found_names_dct)
+            yield names
 
-def _check_fs(inference_state, file_io, regex):
-    try:
-        code = file_io.read()
-    except FileNotFoundError:
-        return None
-    code = python_bytes_to_unicode(code, errors='replace')
-    if not regex.search(code):
-        return None
+
+def _load_module_context(inference_state, file_io, code):
     new_file_io = KnownContentFileIO(file_io.path, code)
     m = load_module_from_path(inference_state, new_file_io)
     if m.is_compiled():
@@ -175,51 +187,60 @@ def _check_fs(inference_state, file_io, regex):
     return m.as_context()
 
 
-def gitignored_lines(folder_io, file_io):
-    ignored_paths = set()
-    ignored_names = set()
-    for l in file_io.read().splitlines():
-        if not l or l.startswith(b'#'):
-            continue
-
-        p = l.decode('utf-8', 'ignore')
-        if p.startswith('/'):
-            name = p[1:]
-            if name.endswith(os.path.sep):
-                name = name[:-1]
-            ignored_paths.add(os.path.join(folder_io.path, name))
-        else:
-            ignored_names.add(p)
-    return ignored_paths, ignored_names
-
+def recurse_find_python_folders_and_files(folder_io, except_paths=(),
+                                          folder_excludes=None):
+    """
+    Folders ignored by ``.gitignore`` files (the ones in folders above too),
+    matching ``folder_excludes`` or ``_IGNORE_FOLDERS`` are not walked.
 
-def recurse_find_python_folders_and_files(folder_io, except_paths=()):
+    Folders are walked top-down like ``os.walk`` does, but directory entries
+    are filtered by their names before any object is created for them.
+    """
     except_paths = set(except_paths)
-    for root_folder_io, folder_ios, file_ios in folder_io.walk():
-        # Delete folders that we don't want to iterate over.
-        for file_io in file_ios:
-            path = file_io.path
-            if path.endswith('.py') or path.endswith('.pyi'):
-                if path not in except_paths:
-                    yield None, file_io
-
-            if path.endswith('.gitignore'):
-                ignored_paths, ignored_names = \
-                    gitignored_lines(root_folder_io, file_io)
-                except_paths |= ignored_paths
-
-        folder_ios[:] = [
-            folder_io
-            for folder_io in folder_ios
-            if folder_io.path not in except_paths
-            and folder_io.get_base_name() not in _IGNORE_FOLDERS
+    stack = [(folder_io.path, get_parent_gitignores(folder_io.path))]
+    while stack:
+        path, gitignores = stack.pop()
+        try:
+            entries = list(scandir(path))
+        except OSError:
+            continue
+
+        for entry in entries:
+            if entry.name == '.gitignore':
+                gitignore = load_gitignore(entry.path)
+                if gitignore is not None:
+                    gitignores += (gitignore,)
+
+        folder_paths = []
+        for entry in entries:
+            name = entry.name
+            if name.endswith('.py') or name.endswith('.pyi'):
+                if entry.is_dir():
+                    folder_paths.append(entry.path)
+                elif entry.path not in except_paths \
+                        and not is_ignored(gitignores, entry.path, False):
+                    yield None, FileIO(entry.path, entry)
+            elif name not in _IGNORE_FOLDERS and entry.is_dir():
+                folder_paths.append(entry.path)
+
+        folder_paths = [
+            p for p in folder_paths
+            if p not in except_paths
+            and not (folder_excludes is not None and folder_excludes.match(p))
+            and not is_ignored(gitignores, p, True)
         ]
-        for folder_io in folder_ios:
-            yield folder_io, None
+        for p in folder_paths:
+            yield FolderIO(p), None
+        # Like os.walk, links to folders are not followed.
+        stack.extend(
+            (p, gitignores) for p in reversed(folder_paths)
+            if not os.path.islink(p)
+        )
 
 
-def recurse_find_python_files(folder_io, except_paths=()):
-    for folder_io, file_io in recurse_find_python_folders_and_files(folder_io, except_paths):
+def recurse_find_python_files(folder_io, except_paths=(), folder_excludes=None):
+    for folder_io, file_io in recurse_find_python_folders_and_files(
+            folder_io, except_paths, folder_excludes):
         if file_io is not None:
             yield file_io
 
@@ -238,7 +259,9 @@ def _find_python_files_in_sys_path(inference_state, module_contexts):
             path = folder_io.path
             if not any(path.startswith(p) for p in sys_path) or path in except_paths:
                 break
-            for file_io in recurse_find_python_files(folder_io, except_paths):
+            for file_io in recurse_find_python_files(
+                    folder_io, except_paths,
+                    inference_state.project._get_folder_excludes()):
                 if file_io.path not in yielded_paths:
                     yield file_io
             except_paths.add(path)
@@ -246,12 +269,13 @@ def _find_python_files_in_sys_path(inference_state, module_contexts):
 
 
 def get_module_contexts_containing_name(inference_state, module_contexts, name,
-                                        limit_reduction=1):
+                                        limit_reduction=1, parse_limit=None):
     """
     Search a name in the directories of modules.
 
-    :param limit_reduction: Divides the limits on opening/parsing files by this
-        factor.
+    :param limit_reduction: Divides the limit on parsing files by this factor.
+    :param parse_limit: The limit on parsing files, ``_PARSED_FILE_LIMIT`` if
+        None.
     """
     # Skip non python modules
     for module_context in module_contexts:
@@ -266,26 +290,41 @@ def get_module_contexts_containing_name(inference_state, module_contexts, name,
 
     file_io_iterator = _find_python_files_in_sys_path(inference_state, module_contexts)
     for x in search_in_file_ios(inference_state, file_io_iterator, name,
-                                limit_reduction=limit_reduction):
+                                limit_reduction=limit_reduction,
+                                parse_limit=parse_limit):
         yield x  # Python 2...
 
 
-def search_in_file_ios(inference_state, file_io_iterator, name, limit_reduction=1):
-    parse_limit = _PARSED_FILE_LIMIT / limit_reduction
-    open_limit = _OPENED_FILE_LIMIT / limit_reduction
-    file_io_count = 0
-    parsed_file_count = 0
-    regex = re.compile(r'\b' + re.escape(name) + r'\b')
-    for file_io in file_io_iterator:
-        file_io_count += 1
-        m = _check_fs(inference_state, file_io, regex)
-        if m is not None:
-            parsed_file_count += 1
-            yield m
-            if parsed_file_count >= parse_limit:
-                dbg('Hit limit of parsed files: %s', parse_limit)
-                break
+def search_in_file_ios(inference_state, file_io_iterator, name, limit_reduction=1,
+                       parse_limit=None):
+    """
+    Files are looked up in the identifier index of the project, so only
+    files containing the name (and files changed since they were indexed)
+    are read and there's no need to limit the amount of opened files.
 
-        if file_io_count >= open_limit:
-            dbg('Hit limit of opened files: %s', open_limit)
-            break
+    Files found are parsed in batches by :data:`jedi.settings.parse_processes`
+    processes, modules are yielded in the order of the file ios anyway.
+    """
+    if parse_limit is None:
+        parse_limit = _PARSED_FILE_LIMIT
+    parse_limit /= limit_reduction
+    parsed_file_count = 0
+    index = get_identifier_index(inference_state.project._path)
+    found = index.search(file_io_iterator, name)
+    batch_size = max(1, settings.parse_processes)
+    while parsed_file_count < parse_limit:
+        batch = list(islice(found, batch_size))
+        if not batch:
+            return
+        # Stubs are parsed with the latest grammar, in this process.
+        parse_in_processes(inference_state.grammar, [
+            f.path for f, _ in batch if f.path.endswith('.py')
+        ])
+        for file_io, code in batch:
+            m = _load_module_context(inference_state, file_io, code)
+            if m is not None:
+                parsed_file_count += 1
+                yield m
+                if parsed_file_count >= parse_limit:
+                    break
+    dbg('Hit limit of parsed files: %s', parse_limit)
@@ -29,6 +29,7 @@ Parser
 ~~~~~~
 
 .. autodata:: fast_parser
+.. autodata:: parse_processes
 
 
 Dynamic stuff
@@ -98,6 +99,13 @@ parse the parts again that have changed, while reusing the rest of the syntax
 tree.
 """
 
+parse_processes = 0
+"""
+Number of processes parsing files, when references are searched in many of
+them. Files are parsed in the current process if it's 0. Processes are
+started with :data:`sys.executable`, so it has to be a Python interpreter.
+"""
+
 _cropped_file_size = 10e6  # 1 Megabyte
 """
 Jedi gets extremely slow if the file size exceed a few thousand lines.
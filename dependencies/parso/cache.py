@@ -8,6 +8,8 @@ import platform
 import errno
 import logging
 import warnings
+import threading
+from collections import OrderedDict
 
 try:
     import cPickle as pickle
@@ -15,31 +17,33 @@ except:
     import pickle
 
 from parso._compatibility import FileNotFoundError, PermissionError, scandir
-from parso.file_io import FileIO
+from parso.file_io import FileIO, KnownContentFileIO
+from parso.utils import python_bytes_to_unicode
+from parso.pack import PackFile
+from parso import serialize
 
 LOG = logging.getLogger(__name__)
 
-_CACHED_FILE_MINIMUM_SURVIVAL = 60 * 10  # 10 minutes
-"""
-Cached files should survive at least a few minutes.
-"""
-
 _CACHED_FILE_MAXIMUM_SURVIVAL = 60 * 60 * 24 * 30
 """
 Maximum time for a cached file to survive if it is not
 accessed within.
 """
 
-_CACHED_SIZE_TRIGGER = 600
+_MEMORY_BUDGET = 512 * 1024 * 1024
 """
-This setting limits the amount of cached files. It's basically a way to start
-garbage collection.
+Modules used least recently are removed from the memory cache, when the
+estimated memory of all of them exceeds this many bytes. See
+:func:`set_memory_budget`.
 
-The reasoning for this limit being as big as it is, is the following:
+Numpy, Pandas, Matplotlib and Tensorflow together use about 500 files and
+about 500mb of memory.
+"""
 
-Numpy, Pandas, Matplotlib and Tensorflow together use about 500 files. This
-makes Jedi use ~500mb of memory. Since we might want a bit more than those few
-libraries, we just increase it a bit.
+_MODULE_SIZE_PER_CHARACTER = 30
+"""
+A parsed module with its lines takes about this many bytes of memory per
+character of code.
 """
 
 _PICKLE_VERSION = 33
@@ -55,6 +59,15 @@ are regarded as incompatible.
 - A __slot__ of a class is changed.
 """
 
+_TREE_FORMAT_VERSION = 1
+"""
+Version number (integer) of the format modules are saved in to the pack, see
+:mod:`parso.serialize`. It's a part of the keys of modules, increment it when
+the format changes.
+
+Trees it can't save (with slots other than strings) are pickled instead.
+"""
+
 _VERSION_TAG = '%s-%s%s-%s' % (
     platform.python_implementation(),
     sys.version_info[0],
@@ -93,6 +106,28 @@ On Linux, if environment variable ``$XDG_CACHE_HOME`` is set,
 
 _CACHE_CLEAR_THRESHOLD = 60 * 60 * 24
 
+_USE_PACK = True
+"""
+Modules are saved to a single pack file per cache directory instead of a
+pickle file per module, see :mod:`parso.pack`. Pickle files saved before are
+moved to the pack when they are loaded.
+
+Modules in the pack are keyed by a hash of their code, so files with the
+same code (e.g. a library installed in several virtualenvs, or a file after
+switching branches back and forth) share one. For every path there's a record
+of the modification time, size and hash of the code it was saved with, the
+file is hashed again only if they differ.
+
+A module stays in the pack after files move away from its code, any of them
+(or another file) might get it back. Modules are dropped once they were saved
+longer than :data:`_CACHED_FILE_MAXIMUM_SURVIVAL` ago, and parsed and saved
+again when they are still needed.
+"""
+
+_PACK_NAME = 'modules.pack'
+
+_packs = {}
+
 def _get_cache_clear_lock(cache_path = None):
     """
     The path where the cache lock is stored.
@@ -104,7 +139,95 @@ def _get_cache_clear_lock(cache_path = None):
     return FileIO(os.path.join(cache_path, "PARSO-CACHE-LOCK"))
 
 
-parser_cache = {}
+class _ParserCache(dict):
+    """
+    ``parser_cache[hashed_grammar][path]`` is a :class:`_NodeCacheItem`.
+
+    Modules are kept in the order they were used in, together with their
+    estimated memory, to remove the ones used least recently when the memory
+    budget is exceeded. The module used last is always kept.
+    """
+    def __init__(self):
+        super(_ParserCache, self).__init__()
+        self._lock = threading.Lock()
+        self._lru = OrderedDict()  # (hashed_grammar, path) -> estimated size
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        with self._lock:
+            super(_ParserCache, self).clear()
+            self._lru.clear()
+            self._size = 0
+
+    def use(self, hashed_grammar, path):
+        with self._lock:
+            self.hits += 1
+            key = hashed_grammar, path
+            size = self._lru.pop(key, None)
+            if size is not None:
+                self._lru[key] = size
+
+    def miss(self):
+        with self._lock:
+            self.misses += 1
+
+    def add(self, hashed_grammar, path, module_cache_item):
+        size = _MODULE_SIZE_PER_CHARACTER \
+            * sum(len(line) for line in module_cache_item.lines)
+        with self._lock:
+            self.setdefault(hashed_grammar, {})[path] = module_cache_item
+            key = hashed_grammar, path
+            self._size += size - self._lru.pop(key, 0)
+            self._lru[key] = size
+            self._shrink()
+
+    def _shrink(self):
+        while self._size > _MEMORY_BUDGET and len(self._lru) > 1:
+            (hashed_grammar, path), size = self._lru.popitem(last=False)
+            self._size -= size
+            self.evictions += 1
+            path_to_item_map = self.get(hashed_grammar)
+            if path_to_item_map is not None:
+                path_to_item_map.pop(path, None)
+
+    def set_memory_budget(self, budget):
+        global _MEMORY_BUDGET
+        with self._lock:
+            _MEMORY_BUDGET = budget
+            self._shrink()
+
+    def get_statistics(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'modules': len(self._lru),
+                'size': self._size,
+                'budget': _MEMORY_BUDGET,
+            }
+
+
+parser_cache = _ParserCache()
+
+
+def set_memory_budget(budget):
+    """
+    Sets how many bytes of memory cached modules may take about, modules used
+    least recently are removed right away if they take more.
+    """
+    parser_cache.set_memory_budget(budget)
+
+
+def get_statistics():
+    """
+    Returns hits, misses and evictions of the memory cache, how many modules
+    it has and their estimated size in bytes.
+    """
+    return parser_cache.get_statistics()
 
 
 class _NodeCacheItem(object):
@@ -114,7 +237,6 @@ class _NodeCacheItem(object):
         if change_time is None:
             change_time = time.time()
         self.change_time = change_time
-        self.last_used = change_time
 
 
 def load_module(hashed_grammar, file_io, cache_path=None):
@@ -128,22 +250,33 @@ def load_module(hashed_grammar, file_io, cache_path=None):
     try:
         module_cache_item = parser_cache[hashed_grammar][file_io.path]
         if p_time <= module_cache_item.change_time:
-            module_cache_item.last_used = time.time()
+            parser_cache.use(hashed_grammar, file_io.path)
             return module_cache_item.node
     except KeyError:
-        return _load_from_file_system(
-            hashed_grammar,
-            file_io.path,
-            p_time,
-            cache_path=cache_path
-        )
-
+        pass
+    parser_cache.miss()
+    return _load_from_file_system(
+        hashed_grammar,
+        file_io.path,
+        p_time,
+        cache_path=cache_path,
+        file_io=file_io,
+    )
+
+
+def _load_from_file_system(hashed_grammar, path, p_time, cache_path=None, file_io=None):
+    if _USE_PACK:
+        module_cache_item = _load_from_pack(
+            hashed_grammar, file_io or FileIO(path), p_time, cache_path)
+        if module_cache_item is not None:
+            _set_cache_item(hashed_grammar, path, module_cache_item)
+            LOG.debug('pickle loaded from pack: %s', path)
+            return module_cache_item.node
 
-def _load_from_file_system(hashed_grammar, path, p_time, cache_path=None):
-    cache_path = _get_hashed_path(hashed_grammar, path, cache_path=cache_path)
+    pickle_path = _get_hashed_path(hashed_grammar, path, cache_path=cache_path)
     try:
         try:
-            if p_time > os.path.getmtime(cache_path):
+            if p_time > os.path.getmtime(pickle_path):
                 # Cache is outdated
                 return None
         except OSError as e:
@@ -153,34 +286,94 @@ def _load_from_file_system(hashed_grammar, path, p_time, cache_path=None):
             else:
                 raise
 
-        with open(cache_path, 'rb') as f:
-            gc.disable()
-            try:
-                module_cache_item = pickle.load(f)
-            finally:
-                gc.enable()
+        with open(pickle_path, 'rb') as f:
+            module_cache_item = _loads(f.read())
     except FileNotFoundError:
         return None
     else:
+        if _USE_PACK and _save_to_pack(hashed_grammar, path, module_cache_item,
+                                       cache_path, is_file=True):
+            try:
+                os.remove(pickle_path)
+            except OSError:
+                pass
         _set_cache_item(hashed_grammar, path, module_cache_item)
         LOG.debug('pickle loaded: %s', path)
         return module_cache_item.node
 
 
-def _set_cache_item(hashed_grammar, path, module_cache_item):
-    if sum(len(v) for v in parser_cache.values()) >= _CACHED_SIZE_TRIGGER:
-        # Garbage collection of old cache files.
-        # We are basically throwing everything away that hasn't been accessed
-        # in 10 minutes.
-        cutoff_time = time.time() - _CACHED_FILE_MINIMUM_SURVIVAL
-        for key, path_to_item_map in parser_cache.items():
-            parser_cache[key] = {
-                path: node_item
-                for path, node_item in path_to_item_map.items()
-                if node_item.last_used > cutoff_time
-            }
+def _load_from_pack(hashed_grammar, file_io, p_time, cache_path):
+    pack = _get_pack(cache_path)
+    is_file = not isinstance(file_io, KnownContentFileIO)
+    path_key = _get_cache_key(hashed_grammar, file_io.path)
+    stat = None
+    if is_file:
+        try:
+            stat = os.stat(file_io.path)
+        except OSError:
+            return None
+        data = pack.get(path_key)
+        if data is not None:
+            record = _loads(data[0])
+            if isinstance(record, tuple) \
+                    and record[:2] == (stat.st_mtime, stat.st_size):
+                data = pack.get(_get_content_key(hashed_grammar, record[2]))
+                if data is not None:
+                    return _load_content_item(data[0], p_time)
+
+    # The file was modified, touched or never cached, its code might be.
+    try:
+        digest = _hash_code(python_bytes_to_unicode(file_io.read()))
+    except (IOError, OSError, UnicodeError, LookupError):
+        return None
+    data = pack.get(_get_content_key(hashed_grammar, digest))
+    if data is None:
+        return None
+    if is_file:
+        pack.put(path_key, _dumps((stat.st_mtime, stat.st_size, digest)))
+    return _load_content_item(data[0], p_time)
+
+
+def _load_content_item(data, p_time):
+    data = memoryview(data)
+    if data[:1] == b'T':
+        gc.disable()
+        try:
+            node, lines = serialize.loads(data[1:])
+        finally:
+            gc.enable()
+        return _NodeCacheItem(node, lines, p_time)
+    module_cache_item = _loads(data[1:])
+    # It was saved for another file or time, but the code is the same.
+    module_cache_item.change_time = p_time
+    return module_cache_item
+
+
+def _dump_content_item(item):
+    try:
+        return b'T' + serialize.dumps(item.node, item.lines)
+    except ValueError:
+        return b'P' + _dumps(item)
 
-    parser_cache.setdefault(hashed_grammar, {})[path] = module_cache_item
+
+def _hash_code(code):
+    return hashlib.sha256(code.encode('utf-8')).hexdigest()
+
+
+def _dumps(obj):
+    return pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+
+
+def _loads(data):
+    gc.disable()
+    try:
+        return pickle.loads(data)
+    finally:
+        gc.enable()
+
+
+def _set_cache_item(hashed_grammar, path, module_cache_item):
+    parser_cache.add(hashed_grammar, path, module_cache_item)
 
 
 def try_to_save_module(hashed_grammar, file_io, module, lines, pickling=True, cache_path=None):
@@ -195,7 +388,8 @@ def try_to_save_module(hashed_grammar, file_io, module, lines, pickling=True, ca
     _set_cache_item(hashed_grammar, path, item)
     if pickling and path is not None:
         try:
-            _save_to_file_system(hashed_grammar, path, item, cache_path=cache_path)
+            _save_to_file_system(hashed_grammar, path, item, cache_path=cache_path,
+                                 is_file=not isinstance(file_io, KnownContentFileIO))
         except PermissionError:
             # It's not really a big issue if the cache cannot be saved to the
             # file system. It's still in RAM in that case. However we should
@@ -208,16 +402,45 @@ def try_to_save_module(hashed_grammar, file_io, module, lines, pickling=True, ca
             _remove_cache_and_update_lock(cache_path=cache_path)
 
 
-def _save_to_file_system(hashed_grammar, path, item, cache_path=None):
+def _save_to_file_system(hashed_grammar, path, item, cache_path=None, is_file=True):
+    if _USE_PACK and _save_to_pack(hashed_grammar, path, item, cache_path, is_file):
+        return
     with open(_get_hashed_path(hashed_grammar, path, cache_path=cache_path), 'wb') as f:
         pickle.dump(item, f, pickle.HIGHEST_PROTOCOL)
 
 
+def _save_to_pack(hashed_grammar, path, item, cache_path, is_file):
+    """
+    Saves the module by the hash of its code, unless it's there already, and
+    the path record, if the module was parsed from the file.
+    """
+    pack = _get_pack(cache_path)
+    try:
+        digest = _hash_code(''.join(item.lines))
+    except UnicodeError:
+        return False
+    content_key = _get_content_key(hashed_grammar, digest)
+    if content_key not in pack \
+            and not pack.put(content_key, _dump_content_item(item)):
+        return False
+    if is_file:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return True
+        if stat.st_mtime == item.change_time:
+            # Otherwise the file changed after it was read.
+            pack.put(_get_cache_key(hashed_grammar, path),
+                     _dumps((stat.st_mtime, stat.st_size, digest)))
+    return True
+
+
 def clear_cache(cache_path=None):
     if cache_path is None:
         cache_path = _default_cache_path
     shutil.rmtree(cache_path)
     parser_cache.clear()
+    _packs.clear()
 
 
 def clear_inactive_cache(
@@ -262,9 +485,28 @@ def _remove_cache_and_update_lock(cache_path = None):
 
 def _get_hashed_path(hashed_grammar, path, cache_path=None):
     directory = _get_cache_directory_path(cache_path=cache_path)
+    return os.path.join(directory, _get_cache_key(hashed_grammar, path) + '.pkl')
+
 
+def _get_cache_key(hashed_grammar, path):
     file_hash = hashlib.sha256(path.encode("utf-8")).hexdigest()
-    return os.path.join(directory, '%s-%s.pkl' % (hashed_grammar, file_hash))
+    return '%s-%s' % (hashed_grammar, file_hash)
+
+
+def _get_content_key(hashed_grammar, digest):
+    return '%s-code%s-%s' % (hashed_grammar, _TREE_FORMAT_VERSION, digest)
+
+
+def _get_pack(cache_path=None):
+    directory = _get_cache_directory_path(cache_path=cache_path)
+    try:
+        return _packs[directory]
+    except KeyError:
+        pack = _packs[directory] = PackFile(
+            os.path.join(directory, _PACK_NAME),
+            max_age=_CACHED_FILE_MAXIMUM_SURVIVAL,
+        )
+        return pack
 
 
 def _get_cache_directory_path(cache_path=None):
@@ -0,0 +1,228 @@
+"""
+A file system cache store, that keeps all modules of a cache directory in a
+single append-only pack file instead of a pickle file per module.
+
+A record is a header (magic, key length, data length, the time it was saved
+and a CRC of data), the key and the data. The index of keys is built by
+reading headers only, through a memory map, and is updated as other processes
+append records. A newer record of a key supersedes older ones, the pack is
+compacted when superseded and expired records take more space than current
+ones.
+"""
+import os
+import mmap
+import time
+import zlib
+import struct
+import threading
+
+try:
+    from os import replace
+except ImportError:
+    # Python 2
+    from os import rename as replace
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+_MAGIC = b'PPK1'
+_HEADER = struct.Struct('<4sHIdI')
+
+_COMPACT_MIN_SIZE = 16 * 1024 * 1024
+"""
+Packs smaller than this are never compacted.
+"""
+
+
+class PackFile(object):
+    def __init__(self, path, max_age=None):
+        """
+        :param max_age: Records saved longer than this many seconds ago are
+            dropped, and removed from the file when the pack is compacted.
+        """
+        self.path = path
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._index = {}  # key -> (data offset, data length, saved time, crc)
+        self._scanned = 0
+        self._dead_size = 0
+        self._oldest = None
+        self._identity = None
+        self._map = None
+
+    def get(self, key, newer_than=0):
+        """
+        Returns the data of the key and the time it was saved, or None if
+        there's no such record saved after ``newer_than``.
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None or entry[2] < newer_than:
+                # Another process might have saved it.
+                self._refresh()
+                entry = self._index.get(key)
+                if entry is None or entry[2] < newer_than:
+                    return None
+            start, length, saved, crc = entry
+            data = self._map[start:start + length]
+        if zlib.crc32(data) & 0xffffffff != crc:
+            return None
+        return data, saved
+
+    def __contains__(self, key):
+        with self._lock:
+            if key not in self._index:
+                self._refresh()
+            return key in self._index
+
+    def put(self, key, data):
+        """
+        Appends a record. Returns False if the pack couldn't be locked.
+        """
+        key_bytes = key.encode('ascii')
+        crc = zlib.crc32(data) & 0xffffffff
+        record = _HEADER.pack(_MAGIC, len(key_bytes), len(data), time.time(), crc)
+        with self._lock:
+            with _FileLock(self.path + '.lock') as locked:
+                if not locked:
+                    return False
+                with open(self.path, 'ab') as f:
+                    self._refresh()
+                    f.seek(0, os.SEEK_END)
+                    if f.tell() > self._scanned:
+                        # A process died while writing a record.
+                        f.truncate(self._scanned)
+                    f.write(record + key_bytes + data)
+                self._refresh()
+                self._expire()
+                if self._dead_size > max(self._scanned - self._dead_size,
+                                         _COMPACT_MIN_SIZE):
+                    self._compact()
+        return True
+
+    def _expire(self):
+        """Drops records saved longer than ``max_age`` ago from the index."""
+        if self.max_age is None or self._oldest is None:
+            return
+        cutoff = time.time() - self.max_age
+        if self._oldest >= cutoff:
+            return
+        self._oldest = None
+        for key, entry in list(self._index.items()):
+            if entry[2] < cutoff:
+                del self._index[key]
+                self._dead_size += _HEADER.size + len(key) + entry[1]
+            elif self._oldest is None or entry[2] < self._oldest:
+                self._oldest = entry[2]
+
+    def _refresh(self):
+        """Maps the pack again and indexes records appended since."""
+        try:
+            f = open(self.path, 'rb')
+        except (IOError, OSError):
+            self._reset()
+            return
+        with f:
+            stat = os.fstat(f.fileno())
+            identity = stat.st_dev, stat.st_ino
+            if identity != self._identity or stat.st_size < self._scanned:
+                # The pack was compacted or removed since.
+                self._reset()
+                self._identity = identity
+            if stat.st_size == self._scanned:
+                return
+            try:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                return
+        self._scan()
+
+    def _scan(self):
+        m = self._map
+        size = len(m)
+        offset = self._scanned
+        while offset + _HEADER.size <= size:
+            magic, key_length, length, saved, crc = _HEADER.unpack_from(m, offset)
+            if magic != _MAGIC:
+                break
+            start = offset + _HEADER.size + key_length
+            end = start + length
+            if end > size:
+                # Still being written.
+                break
+            key = m[offset + _HEADER.size:start].decode('ascii')
+            old = self._index.get(key)
+            if old is not None:
+                self._dead_size += _HEADER.size + key_length + old[1]
+            self._index[key] = start, length, saved, crc
+            if self._oldest is None or saved < self._oldest:
+                self._oldest = saved
+            offset = end
+        self._scanned = offset
+
+    def _compact(self):
+        """Rewrites the pack with current records, must be locked."""
+        cutoff = 0 if self.max_age is None else time.time() - self.max_age
+        temporary = '%s.%s' % (self.path, os.getpid())
+        try:
+            with open(temporary, 'wb') as f:
+                for key, (start, length, saved, crc) in sorted(
+                        self._index.items(), key=lambda item: item[1][0]):
+                    if saved < cutoff:
+                        continue
+                    key_bytes = key.encode('ascii')
+                    f.write(_HEADER.pack(
+                        _MAGIC, len(key_bytes), length, saved, crc))
+                    f.write(key_bytes)
+                    f.write(self._map[start:start + length])
+            replace(temporary, self.path)
+        except (IOError, OSError):
+            # On Windows packs mapped by other processes can't be replaced.
+            try:
+                os.remove(temporary)
+            except OSError:
+                pass
+            return
+        self._reset()
+
+
+class _FileLock(object):
+    """An exclusive lock of a file between processes."""
+    def __init__(self, path):
+        self._path = path
+        self._file = None
+
+    def __enter__(self):
+        try:
+            self._file = open(self._path, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        except (IOError, OSError):
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            return False
+        return True
+
+    def __exit__(self, *exc_info):
+        if self._file is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
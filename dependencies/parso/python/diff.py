@@ -263,7 +263,7 @@ class DiffParser(object):
 
         self._nodes_tree = _NodesTree(self._module)
 
-    def update(self, old_lines, new_lines):
+    def update(self, old_lines, new_lines, opcodes=None):
         '''
         The algorithm works as follows:
 
@@ -277,6 +277,10 @@ class DiffParser(object):
             - Parse from parsed_until_line + 1 to min(j2 + 1), hopefully not
               much more.
 
+        If the caller already knows which lines changed, it can pass them as
+        ``difflib.SequenceMatcher.get_opcodes`` alike ``opcodes`` to avoid
+        diffing the whole file.
+
         Returns the new module node.
         '''
         LOG.debug('diff parser start')
@@ -288,8 +292,9 @@ class DiffParser(object):
         self._reset()
 
         line_length = len(new_lines)
-        sm = difflib.SequenceMatcher(None, old_lines, self._parser_lines_new)
-        opcodes = sm.get_opcodes()
+        if opcodes is None:
+            sm = difflib.SequenceMatcher(None, old_lines, self._parser_lines_new)
+            opcodes = sm.get_opcodes()
         LOG.debug('line_lengths old: %s; new: %s' % (len(old_lines), line_length))
 
         for operation, i1, i2, j1, j2 in opcodes:
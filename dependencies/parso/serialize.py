@@ -0,0 +1,226 @@
+"""
+A compact format of parser trees for the file system cache, that loads much
+faster than a pickle of the tree.
+
+Instead of an object graph, a tree is saved as flat tables of its leaves (in
+the order of the code) and nodes (the root last), referring to each other by
+their index:
+
+- the classes of leaves and nodes,
+- the values and prefixes of leaves, as ids in a table of interned strings,
+- the positions of leaves,
+- the children of nodes, as ranges of an array of child indexes, and the
+  parents of leaves and nodes,
+- further slots (e.g. the type of a :class:`parso.tree.Node`), as triples of
+  an index, the slot and the value. Slots starting with an underscore are
+  caches, they are reset to ``None``,
+- the used names of a :class:`parso.python.tree.Module`, as ranges of an
+  array of leaf indexes.
+
+Numbers are packed in arrays of the smallest item size they fit in. Loading
+creates the objects and sets their slots a table at a time, looping in C
+rather than in Python (or in pickle's virtual machine per object). Arrays are
+in native byte order and the tables are marshalled, so data can only be loaded
+by the Python version that saved it.
+"""
+import marshal
+from array import array
+from collections import deque
+from importlib import import_module
+from itertools import chain, repeat
+
+from parso.tree import BaseNode, Leaf
+from parso.python.tree import Module, UsedNamesMapping
+
+_KNOWN_SLOTS = frozenset(
+    ('children', 'parent', 'value', 'line', 'column', 'prefix'))
+
+_slots = {}  # class -> (further slot names, cache slot names)
+_classes = {}  # (module name, class name) -> class
+
+
+def dumps(module, lines):
+    """
+    Returns the tree and the lines of its code as bytes. Raises a
+    ``ValueError`` if it has objects that can't be saved this way.
+    """
+    if not isinstance(module, BaseNode):
+        raise ValueError('The root of a tree has to be a node.')
+    leaves = []
+    nodes = []
+    stack = [module]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Leaf):
+            leaves.append(node)
+        else:
+            nodes.append(node)
+            stack.extend(reversed(node.children))
+    # The root goes last, the parents of all others are saved.
+    nodes.append(nodes.pop(0))
+
+    strings = {}
+    kinds = {}
+    indexes = {}
+    kind_ids = []
+    slot_indexes = []
+    slot_names = []
+    slot_values = []
+    for index, node in enumerate(chain(leaves, nodes)):
+        indexes[id(node)] = index
+        cls = type(node)
+        kind_ids.append(kinds.setdefault(cls, len(kinds)))
+        try:
+            names, cache_names = _slots[cls]
+        except KeyError:
+            names, cache_names = _slots[cls] = _get_slots(cls)
+        if cls.__dictoffset__ and node.__dict__:
+            raise ValueError('%s has attributes other than slots.' % cls.__name__)
+        for name in names:
+            value = getattr(node, name)
+            if value is not None and not isinstance(value, str):
+                raise ValueError('%s.%s is not a string.' % (cls.__name__, name))
+            slot_indexes.append(index)
+            slot_names.append(strings.setdefault(name, len(strings)))
+            slot_values.append(strings.setdefault(value, len(strings)))
+        for name in cache_names:
+            slot_indexes.append(index)
+            slot_names.append(strings.setdefault(name, len(strings)))
+            slot_values.append(strings.setdefault(None, len(strings)))
+
+    values = [strings.setdefault(leaf.value, len(strings)) for leaf in leaves]
+    prefixes = [strings.setdefault(leaf.prefix, len(strings)) for leaf in leaves]
+    line_numbers = [leaf.line for leaf in leaves]
+    columns = [leaf.column for leaf in leaves]
+    children = [indexes[id(child)] for node in nodes for child in node.children]
+    child_counts = [len(node.children) for node in nodes]
+    parents = [indexes[id(node.parent)] for node in chain(leaves, nodes[:-1])]
+
+    # Getting them walks the whole tree in Python, it's done for almost every
+    # module Jedi infers in.
+    used_names = {}
+    if isinstance(module, Module):
+        for index, leaf in enumerate(leaves):
+            if leaf.type == 'name':
+                used_names.setdefault(
+                    strings.setdefault(leaf.value, len(strings)), []
+                ).append(index)
+
+    return marshal.dumps((
+        [(cls.__module__, cls.__name__)
+         for cls in sorted(kinds, key=kinds.__getitem__)],
+        sorted(strings, key=strings.__getitem__),
+        _pack(kind_ids),
+        _pack(values),
+        _pack(prefixes),
+        _pack(line_numbers),
+        _pack(columns),
+        _pack(children),
+        _pack(child_counts),
+        _pack(parents),
+        _pack(slot_indexes),
+        _pack(slot_names),
+        _pack(slot_values),
+        _pack(list(used_names)),
+        _pack([len(names) for names in used_names.values()]),
+        _pack(list(chain.from_iterable(used_names.values()))),
+        list(lines),
+    ))
+
+
+def loads(data):
+    """
+    Returns the tree and the lines of its code saved by :func:`dumps`.
+    """
+    (kinds, strings, kind_ids, values, prefixes, line_numbers, columns,
+     children, child_counts, parents, slot_indexes, slot_names, slot_values,
+     used_names, used_name_counts, used_name_leaves,
+     lines) = marshal.loads(data)
+    classes = [_get_class(module_name, class_name)
+               for module_name, class_name in kinds]
+    get_string = strings.__getitem__
+
+    objects = list(map(object.__new__,
+                       map(classes.__getitem__, _unpack(kind_ids))))
+    for name, column in (
+            ('value', map(get_string, _unpack(values))),
+            ('prefix', map(get_string, _unpack(prefixes))),
+            ('line', _unpack(line_numbers)),
+            ('column', _unpack(columns))):
+        _consume(map(setattr, objects, repeat(name), column))
+
+    child_counts = _unpack(child_counts)
+    nodes = objects[len(objects) - len(child_counts):]
+    _consume(map(setattr, nodes, repeat('children'), _split(
+        list(map(objects.__getitem__, _unpack(children))), child_counts)))
+    _consume(map(setattr, objects, repeat('parent'),
+                 map(objects.__getitem__, _unpack(parents))))
+
+    _consume(map(setattr,
+                 map(objects.__getitem__, _unpack(slot_indexes)),
+                 map(get_string, _unpack(slot_names)),
+                 map(get_string, _unpack(slot_values))))
+
+    module = objects[-1]
+    module.parent = None
+    if isinstance(module, Module):
+        module._used_names = UsedNamesMapping(dict(zip(
+            map(get_string, _unpack(used_names)),
+            _split(list(map(objects.__getitem__, _unpack(used_name_leaves))),
+                   _unpack(used_name_counts)),
+        )))
+    return module, lines
+
+
+def _consume(iterator):
+    deque(iterator, maxlen=0)
+
+
+def _pack(numbers):
+    largest = max(numbers) if numbers else 0
+    for typecode in 'BHIL':
+        if largest >> 8 * array(typecode).itemsize == 0:
+            return typecode, array(typecode, numbers).tobytes()
+    raise ValueError('%s is too large.' % largest)
+
+
+def _unpack(packed):
+    typecode, data = packed
+    numbers = array(typecode)
+    numbers.frombytes(data)
+    return numbers
+
+
+def _split(items, counts):
+    """
+    Returns an iterator of lists of consecutive items of the given counts.
+    """
+    ends = []
+    total = 0
+    for count in counts:
+        total += count
+        ends.append(total)
+    return map(items.__getitem__, map(slice, chain((0,), ends), ends))
+
+
+def _get_slots(cls):
+    names = []
+    for base in reversed(cls.__mro__):
+        slots = base.__dict__.get('__slots__', ())
+        if isinstance(slots, str):
+            slots = slots,
+        names += [name for name in slots
+                  if name not in _KNOWN_SLOTS and name not in names]
+    return (
+        tuple(name for name in names if not name.startswith('_')),
+        tuple(name for name in names if name.startswith('_')),
+    )
+
+
+def _get_class(module_name, class_name):
+    key = module_name, class_name
+    try:
+        return _classes[key]
+    except KeyError:
+        cls = _classes[key] = getattr(import_module(module_name), class_name)
+        return cls
@@ -1,13 +1,19 @@
 # -*- coding: utf-8 -*-
 from .completion import SublimeJediParamsAutocomplete, Autocomplete
-from .go_to import SublimeJediFindUsages, SublimeJediEventListener, SublimeJediGoto
+from .daemon import DocumentListener, ProjectListener, shutdown_workers
+from .go_to import (
+    SublimeJediFindUsages, SublimeJediEventListener, SublimeJediGoto,
+    SublimeJediGotoSymbol
+)
 from .helper import (
     SublimeJediDocstring, SublimeJediSignature, SublimeJediTooltip,
-    HelpMessageCommand
+    SublimeJediStats, SublimeJediStatus, HelpMessageCommand
 )
+from .settings import SettingsListener, unwatch_settings
 
 __all__ = [
     'SublimeJediGoto',
+    'SublimeJediGotoSymbol',
     'SublimeJediFindUsages',
     'SublimeJediEventListener',
     'SublimeJediParamsAutocomplete',
@@ -15,5 +21,16 @@ __all__ = [
     'SublimeJediDocstring',
     'SublimeJediSignature',
     'SublimeJediTooltip',
-    'HelpMessageCommand'
+    'SublimeJediStats',
+    'SublimeJediStatus',
+    'DocumentListener',
+    'ProjectListener',
+    'HelpMessageCommand',
+    'SettingsListener',
+    'plugin_unloaded',
 ]
+
+
+def plugin_unloaded():
+    shutdown_workers()
+    unwatch_settings()
@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""Helpers shared by the plugin and the Jedi worker process.
+
+Modules imported by the worker must not depend on Sublime Text API.
+"""
+
+
+def unique(items, pred=lambda x: x):
+    stack = set()
+
+    for i in items:
+        calculated = pred(i)
+        if calculated in stack:
+            continue
+        stack.add(calculated)
+        yield i
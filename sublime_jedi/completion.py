@@ -1,12 +1,15 @@
 # -*- coding: utf-8 -*-
 import re
-from threading import Timer
+from functools import partial
+from threading import Lock, Timer
 
 import sublime
 import sublime_plugin
 
+from . import stats
 from .console_logging import getLogger
 from .daemon import ask_daemon
+from .protocol import SPECULATIVE_BUDGET
 from .utils import get_settings, is_python_scope, is_repl
 
 
@@ -16,6 +19,10 @@ PLUGIN_ONLY_COMPLETION = (
     sublime.INHIBIT_WORD_COMPLETIONS |
     sublime.INHIBIT_EXPLICIT_COMPLETIONS
 )
+# text before the caret, where completions are likely to be asked for:
+# member access, import and call
+PREFETCH_TRIGGER = re.compile(r'(?:[\w)\]]\.|\bimport\s+|\w\()$')
+IDENTIFIER_TAIL = re.compile(r'\w*$')
 
 
 def debounce(wait):
@@ -130,12 +137,115 @@ class SublimeJediParamsAutocomplete(sublime_plugin.TextCommand):
         view.run_command('insert_snippet', {"contents": template})
 
 
+class CompletionSession:
+    """Unfiltered completions at the start of an identifier.
+
+    While the user keeps typing the same identifier, they are narrowed
+    locally instead of asking Jedi again.
+    """
+
+    def __init__(self, view, start, location, speculative=False):
+        self.start = start
+        self.speculative = speculative
+        self._context = _get_context(view, start, location)
+        self._lock = Lock()
+        self._completions = None
+        self._on_ready = None
+
+    def matches(self, view, start, location):
+        return (
+            self.start == start and
+            self._context == _get_context(view, start, location)
+        )
+
+    def get(self, on_ready):
+        """Get completions, or None if they are not computed yet.
+
+        Then ``on_ready`` is called with them later.
+        """
+        with self._lock:
+            if self._completions is None:
+                self._on_ready = on_ready
+            return self._completions
+
+    def resolve(self, completions):
+        """Set completions, return the replaced ones or None.
+
+        :rtype: list or None
+        """
+        with self._lock:
+            previous = self._completions
+            self._completions = completions
+            on_ready, self._on_ready = self._on_ready, None
+        if on_ready is not None:
+            on_ready(completions)
+        return previous
+
+    @property
+    def is_waited_for(self):
+        return self._on_ready is not None
+
+
+def _get_context(view, start, location):
+    """Get what must stay the same for completions at start to be valid.
+
+    It's the line before the identifier and the size of the buffer without
+    the identifier typed since, which detects (most of) edits elsewhere.
+    """
+    line_start = view.line(start).begin()
+    return (
+        view.substr(sublime.Region(line_start, start)),
+        view.size() - (location - start),
+    )
+
+
+def _get_identifier_start(view, location):
+    line = view.substr(sublime.Region(view.line(location).begin(), location))
+    return location - len(IDENTIFIER_TAIL.search(line).group())
+
+
+def narrow_completions(completions, typed):
+    """Filter and rank completions by typed part of identifier.
+
+    Names starting with it go first, then names containing its characters
+    in order, ignoring case, like Jedi's fuzzy completion.
+
+    :type completions: list of (str, str)
+    :type typed: str
+    :rtype: list of (str, str)
+    """
+    lowered = typed.lower()
+    ranked = []
+    for index, completion in enumerate(completions):
+        name = completion[0].split('\t', 1)[0]
+        if name.startswith(typed):
+            rank = 0
+        elif name.lower().startswith(lowered):
+            rank = 1
+        elif _fuzzy_match(name.lower(), lowered):
+            rank = 2
+        else:
+            continue
+        ranked.append((rank, index))
+    ranked.sort()
+    return [completions[index] for _, index in ranked]
+
+
+def _fuzzy_match(name, typed):
+    position = 0
+    for char in typed:
+        position = name.find(char, position) + 1
+        if not position:
+            return False
+    return True
+
+
 class Autocomplete(sublime_plugin.ViewEventListener):
     """Sublime Text autocompletion integration."""
 
     _completions = []
     _previous_completions = []
-    _last_location = None
+    _session = None
 
     def __enabled(self):
         settings = get_settings(self.view)
@@ -171,6 +281,24 @@ class Autocomplete(sublime_plugin.ViewEventListener):
                 self.view.run_command('sublime_jedi_params_autocomplete')
                 break
 
+    def on_modified(self):
+        """Prefetch completions where they are likely to be asked for.
+
+        It runs before the completions triggered by the same modification
+        are queried, so they can wait for the prefetch.
+        """
+        if not get_settings(self.view)['completion_prefetch']:
+            return
+        if len(self.view.sel()) != 1:
+            return
+        location = self.view.sel()[0].begin()
+        line = self.view.substr(
+            sublime.Region(self.view.line(location).begin(), location))
+        if not PREFETCH_TRIGGER.search(line) or not self.__enabled():
+            return
+
+        self._start_session(location, location, speculative=True)
+
     def on_query_completions(self, prefix, locations):
         """Sublime autocomplete event handler.
 
@@ -195,21 +323,79 @@ class Autocomplete(sublime_plugin.ViewEventListener):
             if not re.match(settings['only_complete_after_regex'], previous_char):  # noqa
                 return False
 
-        if self._last_location != locations[0]:
-            self._last_location = locations[0]
-            debounced_ask_daemon(
-                self.view,
-                self._receive_completions,
-                'autocomplete',
-                location=locations[0],
-            )
+        location = locations[0]
+        start = _get_identifier_start(self.view, location)
+        session = self._session
+        if session is None or not session.matches(self.view, start, location):
+            session = self._start_session(start, location)
+
+        completions = session.get(
+            on_ready=partial(self._receive_completions, self.view))
+        if completions is None:
+            stats.increment('awaited', 'autocomplete')
+            if session.speculative:
+                # the prefetch may be stopped, don't wait for it forever
+                sublime.set_timeout_async(
+                    partial(self._ask_instead_of, session),
+                    int(SPECULATIVE_BUDGET * 1000)
+                )
             return [], PLUGIN_ONLY_COMPLETION
 
-        if self._last_location == locations[0]:
-            self._last_location = None
-            return self._completions
+        stats.increment('narrowed', 'autocomplete')
+        self._completions = narrow_completions(
+            completions,
+            self.view.substr(sublime.Region(start, location)),
+        )
+        return self._completions
+
+    def _start_session(self, start, location, speculative=False):
+        """Ask Jedi for all completions at the start of an identifier.
 
-    def _receive_completions(self, view, completions):
+        :rtype: CompletionSession
+        """
+        session = self._session = CompletionSession(
+            self.view, start, location, speculative)
+        ask = ask_daemon if speculative else debounced_ask_daemon
+        self._ask(ask, session, speculative=speculative)
+        return session
+
+    def _ask_instead_of(self, session):
+        if session.is_waited_for and self._session is session:
+            stats.increment('prefetch timeout', 'autocomplete')
+            self._ask(ask_daemon, session)
+
+    def _ask(self, ask, session, speculative=False):
+        settings = get_settings(self.view)
+        ask(
+            self.view,
+            partial(self._resolve, session),
+            'autocomplete',
+            location=session.start,
+            speculative=speculative,
+            timeout=settings['completion_timeout'],
+            partial_first=settings['completion_partial_first'],
+            # a prefetch stopped by other requests is asked for right away,
+            # if the popup waits for it
+            on_cancelled=(
+                partial(self._ask_instead_of, session)
+                if speculative else None),
+        )
+
+    def _resolve(self, session, view, completions):
+        if completions is None:
+            # the request failed, the next completion asks again
+            if self._session is session:
+                self._session = None
+            return
+        previous = session.resolve(completions)
+        # inferred completions replace names known without inference,
+        # unless the popup was closed meanwhile
+        if (previous is not None and previous != completions and
+                self._session is session and
+                (not previous or view.is_auto_complete_visible())):
+            self._receive_completions(view, completions, refresh=True)
+
+    def _receive_completions(self, view, completions, refresh=False):
         if not completions:
             return
 
@@ -218,6 +404,7 @@ class Autocomplete(sublime_plugin.ViewEventListener):
         self._previous_completions = self._completions
         self._completions = completions
         if (completions and (
+                refresh or
                 not view.is_auto_complete_visible() or
                 not self._is_completions_subset())):
             only_jedi_completion = (
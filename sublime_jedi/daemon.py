@@ -1,60 +1,228 @@
 # -*- coding: utf-8 -*-
 import os
+import re
+import shutil
+import threading
+import time
 from os.path import dirname as up, abspath
+from collections import OrderedDict
+from itertools import count
 
-from functools import wraps
-from collections import defaultdict
-
-import jedi
+from functools import wraps, partial
 
 import sublime
+import sublime_plugin
+from jedi.api.environment import (
+    InterpreterEnvironment, get_cached_default_environment
+)
 
-from .facade import JediFacade
+from . import stats
 from .console_logging import getLogger
+from .document import DocumentOutOfSync
+from .engine import Engine, ENGINE_SETTINGS
+from .pool import WorkerPool, WorkerUnavailable
+from .protocol import (
+    Generations, SPECULATIVE, STATUS_OK, STATUS_CANCELLED, STATUS_PARTIAL,
+    STATUS_OUT_OF_SYNC, STATUS_UNAVAILABLE
+)
+from .results import ResultCache
+from .session import RequestCancelled
+from .settings import get_plugin_settings
 from .utils import get_settings
 
 logger = getLogger(__name__)
 
-DAEMONS = defaultdict(dict)  # per window
+DAEMONS = OrderedDict()  # per project, the least recently used first
+_DAEMONS_LOCK = threading.Lock()
+
+_POOL = None
+
+# the latest generation of requests per (view id, request type)
+_GENERATIONS = count(1)
+_LATEST = Generations()
+# what a stopped request answers to `Daemon.request_async` callbacks
+CANCELLED = object()
+
+# mirrors of buffers, which Jedi was asked about, per buffer id
+_MIRRORS = {}
+
+# requests, which answers depend only on the buffer and the name at location
+CACHED_REQUESTS = ('docstring', 'signature', 'goto')
+_RESULTS = ResultCache()
+IDENTIFIER = re.compile(r'\w+')
+
+# project root per (directory, window folders): (root, checked at, mtimes)
+_PROJECT_ROOTS = {}
+# how often (in seconds) a cached project root is checked on disk
+PROJECT_ROOT_CHECK_INTERVAL = 5
+
+# how often (in milliseconds) progress of warming the cache is shown
+PREWARM_PROGRESS_INTERVAL = 1000
+PREWARM_STATUS_KEY = 'jedi_prewarm'
 
 
 def _get_daemon(view):
     project_path = _find_project(view)
-    if project_path not in DAEMONS:
-        DAEMONS[project_path] = Daemon(
-            project_path=project_path,
-            settings=get_settings(view)
-        )
-    return DAEMONS[project_path]
+    is_new = False
+    with _DAEMONS_LOCK:
+        daemon = DAEMONS.pop(project_path, None)
+        if daemon is None:
+            daemon = Daemon(
+                project_path=project_path,
+                settings=get_settings(view)
+            )
+            is_new = True
+        daemon.last_used = time.time()
+        DAEMONS[project_path] = daemon
+    if is_new:
+        settings = get_settings(view)
+        if settings['project_symbol_index']:
+            daemon.index_symbols()
+        if settings['parser_cache_prewarm']:
+            daemon.prewarm_cache(settings['parser_cache_prewarm'])
+    _close_unused_daemons()
+    return daemon
+
+
+def _close_unused_daemons():
+    """Close the least recently used daemons over the limit and daemons
+    idle for too long."""
+    settings = get_plugin_settings()
+    max_daemons = settings.get('max_daemons', 8)
+    idle_timeout = settings.get('daemon_idle_timeout', 1800)
+    deadline = time.time() - idle_timeout if idle_timeout else None
+
+    evicted = []
+    with _DAEMONS_LOCK:
+        for project_path, daemon in list(DAEMONS.items()):
+            if len(DAEMONS) > max(max_daemons, 1) or (
+                    deadline is not None and daemon.last_used < deadline):
+                evicted.append(DAEMONS.pop(project_path))
+    for daemon in evicted:
+        logger.info('Closing Jedi daemon of {0}'.format(daemon.project_path))
+        daemon.close()
 
 
 def _find_project(view):
+    """Find project root of the view's file.
+
+    Roots are cached and only rechecked, if any directory on the way up
+    has changed since.
+
+    :type view: sublime.View
+    :rtype: str
+    """
     directory = up(abspath(view.file_name()))
-    while '__init__.py' in os.listdir(directory) and directory != '/':
-        directory = up(directory)
-    if directory == '/':
-        return up(abspath(view.file_name()))
-    else:
-        return directory
+    window = view.window()
+    key = (directory, tuple(window.folders()) if window else ())
+    now = time.time()
 
+    cached = _PROJECT_ROOTS.get(key)
+    if cached is not None:
+        root, checked_at, mtimes = cached
+        if now - checked_at < PROJECT_ROOT_CHECK_INTERVAL:
+            return root
+        if all(_get_mtime(path) == mtime for path, mtime in mtimes):
+            _PROJECT_ROOTS[key] = root, now, mtimes
+            return root
 
-def ask_daemon_sync(view, ask_type, ask_kwargs, location=None):
-    """Jedi sync request shortcut.
+    root, mtimes = _resolve_project_root(*key)
+    _PROJECT_ROOTS[key] = root, now, mtimes
+    return root
 
-    :type view: sublime.View
-    :type ask_type: str
-    :type ask_kwargs: dict or None
-    :type location: type of (int, int) or None
+
+def _resolve_project_root(directory, folders):
+    """Resolve project root the way ``jedi.get_default_project`` does.
+
+    It is the nearest directory with ``.jedi/project.json``, otherwise the
+    first directory that is not a package. The search doesn't leave the
+    window folder of the file.
+
+    :rtype: (str, list of (str, float))
+    """
+    containing = [
+        f for f in folders
+        if directory == f or directory.startswith(os.path.join(f, ''))
+    ]
+    folder = max(containing, key=len) if containing else None
+    mtimes = []
+    first_no_init = None
+    current = directory
+    while up(current) != current:
+        mtimes.append((current, _get_mtime(current)))
+        if os.path.isfile(os.path.join(current, '.jedi', 'project.json')):
+            return current, mtimes
+        if (first_no_init is None and
+                not os.path.exists(os.path.join(current, '__init__.py'))):
+            first_no_init = current
+        if current == folder:
+            break
+        current = up(current)
+    return first_no_init or folder or directory, mtimes
+
+
+def _get_mtime(path):
+    try:
+        return os.stat(path).st_mtime
+    except OSError:
+        return None
+
+
+def _get_pool():
+    """Get pool of Jedi worker processes.
+
+    :rtype: WorkerPool or None
     """
-    daemon = _get_daemon(view)
-    return daemon.request(
-        ask_type,
-        ask_kwargs or {},
-        *_prepare_request_data(view, location)
-    )
+    global _POOL
+    if _POOL is None:
+        settings = get_plugin_settings()
+        size = settings.get('worker_processes', 2)
+        executable = (
+            settings.get('worker_python_interpreter') or
+            shutil.which('python3') or
+            shutil.which('python')
+        )
+        if not size or not executable:
+            logger.info('Jedi workers disabled, running in plugin host.')
+            return None
+        _POOL = WorkerPool(
+            executable, size, settings.get('parse_processes', 2))
+    return _POOL
 
 
-def ask_daemon(view, callback, ask_type, ask_kwargs=None, location=None):
+def _get_default_environment():
+    """Get interpreter of the environment Jedi picks in the plugin host for
+    projects without ``python_interpreter`` and ``python_virtualenv``.
+
+    Workers use it too, instead of their own interpreter. None if it is the
+    interpreter of the plugin host, which only the plugin host can use.
+
+    :rtype: str or None
+    """
+    environment = get_cached_default_environment()
+    if isinstance(environment, InterpreterEnvironment):
+        return None
+    return environment.executable
+
+
+def shutdown_workers():
+    """Stop all Jedi worker processes."""
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown()
+        _POOL = None
+    with _DAEMONS_LOCK:
+        daemons = list(DAEMONS.values())
+        DAEMONS.clear()
+    for daemon in daemons:
+        daemon.close()
+    _MIRRORS.clear()
+    _RESULTS.clear()
+
+
+def ask_daemon(view, callback, ask_type, ask_kwargs=None, location=None,
+               speculative=False, timeout=None, partial_first=False,
+               on_cancelled=None):
     """Jedi async request shortcut.
 
     :type view: sublime.View
@@ -62,15 +230,186 @@ def ask_daemon(view, callback, ask_type, ask_kwargs=None, location=None):
     :type ask_type: str
     :type ask_kwargs: dict or None
     :type location: type of (int, int) or None
+    :type speculative: bool
+    :type timeout: float or None
+    :type partial_first: bool
+    :type on_cancelled: callable or None
+
+    Only the latest request per view and request type is computed:
+    superseded requests are dropped before they start, interrupted while
+    Jedi works on them and their late answers are ignored. Then
+    ``on_cancelled`` is called instead of the callback.
+
+    Speculative requests compute what the user is likely to ask for. They
+    give way to any regular request and are stopped if they take too long.
+
+    Answers of ``CACHED_REQUESTS`` are reused, until the buffer changes.
+
+    Requests, which are not answered in ``timeout`` seconds, are answered
+    with what Jedi knows without inference (if the request type supports
+    that). With ``partial_first`` the callback gets it right away and is
+    called once more with the final answer.
     """
+    if not callback:
+        return
+
     window_id = view.window().id()
+    key = (view.id(), ask_type)
+    if speculative:
+        key = (SPECULATIVE,) + key
+    generation = next(_GENERATIONS)
+    _LATEST.register(key, generation)
+    deadline = time.time() + timeout if timeout else None
+
+    buffer_id = view.buffer_id()
+    version = view.change_count()
+    cache_key = None
+    if ask_type in CACHED_REQUESTS:
+        cache_key = (
+            ask_type,
+            _get_name_region(view, location),
+            tuple(sorted((ask_kwargs or {}).items())),
+        )
 
-    def _async_summon():
-        answer = ask_daemon_sync(view, ask_type, ask_kwargs, location)
+    def _cancelled():
+        if on_cancelled is not None:
+            on_cancelled()
+
+    def _callback(answer, is_final=True):
+        if answer is CANCELLED:
+            _cancelled()
+            return
+        if _is_superseded(key, generation):
+            stats.increment('stale', ask_type)
+            _cancelled()
+            return
+        if is_final:
+            stats.increment('completed', ask_type)
+            if cache_key is not None and answer is not None:
+                _RESULTS.put(buffer_id, version, cache_key, answer)
         _run_in_active_view(window_id)(callback)(answer)
 
-    if callback:
-        sublime.set_timeout_async(_async_summon, 0)
+    if cache_key is not None:
+        answer = _RESULTS.get(buffer_id, version, cache_key)
+        stats.increment(
+            'cache miss' if answer is None else 'cache hit', ask_type)
+        if answer is not None:
+            sublime.set_timeout_async(partial(_callback, answer), 0)
+            return
+
+    def _async_summon():
+        if _is_superseded(key, generation):
+            stats.increment('dropped', ask_type)
+            _cancelled()
+            return
+        daemon = _get_daemon(view)
+        daemon.request_async(
+            _callback,
+            key,
+            generation,
+            ask_type,
+            ask_kwargs or {},
+            *_prepare_request_data(view, location),
+            deadline=deadline,
+            partial_first=partial_first,
+            resync=partial(_resync_request_data, view, location)
+        )
+
+    sublime.set_timeout_async(_async_summon, 0)
+
+
+def search_symbols(view, callback, query):
+    """Find definitions in the project of the view.
+
+    Callback gets ``(symbols, is_complete)``, see
+    ``Engine.search_symbols``, or None if the search failed.
+
+    :type view: sublime.View
+    :type callback: callable
+    :type query: str
+    """
+    window_id = view.window().id()
+
+    def _async_search():
+        _get_daemon(view).search_symbols(
+            _run_in_active_view(window_id)(callback), query)
+
+    sublime.set_timeout_async(_async_search, 0)
+
+
+def _is_superseded(key, generation):
+    return _LATEST.is_superseded(key, generation)
+
+
+def _get_name_region(view, location):
+    """Get region of the name at location, Jedi gives the same answers
+    anywhere in it.
+
+    :rtype: (int, int)
+    """
+    if location is None:
+        location = view.sel()[0].begin()
+    line = view.line(location)
+    column = location - line.begin()
+    for match in IDENTIFIER.finditer(view.substr(line)):
+        if match.start() <= column <= match.end():
+            return line.begin() + match.start(), line.begin() + match.end()
+    return location, location
+
+
+def get_stats():
+    """Collect request counters of plugin host and Jedi workers.
+
+    :rtype: list of (str, dict)
+    """
+    return [('plugin host', stats.snapshot())] + _ask_workers('stats')
+
+
+def get_status():
+    """Describe live daemons of the plugin host and Jedi workers.
+
+    :rtype: list of (str, dict)
+    """
+    with _DAEMONS_LOCK:
+        daemons = list(DAEMONS.values())
+    now = time.time()
+    result = [('plugin host', {
+        'pid': os.getpid(),
+        'memory': stats.get_memory_usage(),
+        'parser_cache': stats.get_parser_cache_usage(),
+        'daemons': {
+            daemon.project_path: dict(
+                daemon.status(), idle=int(now - daemon.last_used))
+            for daemon in daemons
+        },
+    })]
+    return result + _ask_workers('status')
+
+
+def _ask_workers(method):
+    """Ask every running worker and wait a second for answers.
+
+    :rtype: list of (str, object)
+    """
+    result = []
+    if _POOL is None:
+        return result
+
+    for worker in _POOL.workers:
+        if not worker.is_alive:
+            continue
+        answered = threading.Event()
+        answer = []
+
+        def _callback(status, payload):
+            if status == STATUS_OK:
+                answer.append(payload)
+            answered.set()
+
+        worker.send(method, (), _callback)
+        if answered.wait(1) and answer:
+            result.append((repr(worker), answer[0]))
+    return result
 
 
 def _run_in_active_view(window_id):
@@ -98,55 +437,374 @@ def _prepare_request_data(view, location):
     current_line, current_column = view.rowcol(location)
 
     filename = view.file_name() or ''
-    source = view.substr(sublime.Region(0, view.size()))
-    return filename, source, current_line, current_column
+    buffer_id = view.buffer_id()
+    mirror = _MIRRORS.get(buffer_id)
+    if mirror is None:
+        mirror = _MIRRORS[buffer_id] = DocumentMirror()
+    return filename, buffer_id, mirror.sync(view), current_line, \
+        current_column
+
+
+def _resync_request_data(view, location):
+    """Prepare request data with the whole buffer, for an engine which lost
+    its copy of it."""
+    _forget_document(view.buffer_id())
+    return _prepare_request_data(view, location)
+
+
+def _forget_document(buffer_id):
+    """Send the whole buffer with the next request."""
+    _MIRRORS.pop(buffer_id, None)
+
+
+class DocumentMirror:
+    """What Jedi engine knows about a buffer.
+
+    Sublime Text 4 reports text changes, so after the first request only
+    edits since the previous one are sent. On Sublime Text 3, or if any
+    change was missed, the whole text is sent.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # change count of the buffer sent last time
+        self._version = None
+        # edits after the sent version, up to the recorded change count
+        self._edits = []
+        self._recorded_version = None
+
+    def record(self, changes, change_count):
+        """Remember text changes of the buffer.
+
+        :type changes: list of sublime.TextChange
+        :type change_count: int
+        """
+        with self._lock:
+            if self._version is None:
+                return
+            self._edits.extend(
+                (c.a.row, c.a.col, c.b.row, c.b.col, c.str) for c in changes)
+            self._recorded_version = change_count
+
+    def sync(self, view):
+        """Get buffer update for Jedi engine, see ``Document.update``.
+
+        :type view: sublime.View
+        :rtype: tuple
+        """
+        with self._lock:
+            change_count = view.change_count()
+            if (self._version is not None and
+                    self._recorded_version == change_count):
+                document = (
+                    'edits', self._version, change_count, self._edits,
+                    view.size())
+            else:
+                document = (
+                    'full', change_count,
+                    view.substr(sublime.Region(0, view.size())))
+            self._version = self._recorded_version = change_count
+            self._edits = []
+            return document
+
+
+class ProjectListener(sublime_plugin.EventListener):
+    """Resolve project of a python file, before Jedi is asked about it,
+    and close daemons of projects, that are not used any more."""
+
+    def on_activated_async(self, view):
+        if view.file_name() and view.match_selector(0, 'source.python'):
+            _find_project(view)
+        _close_unused_daemons()
+
+    def on_post_save_async(self, view):
+        """Index definitions of the saved file."""
+        if not view.match_selector(0, 'source.python'):
+            return
+        if not get_settings(view)['project_symbol_index']:
+            return
+        with _DAEMONS_LOCK:
+            daemon = DAEMONS.get(_find_project(view))
+        if daemon is not None:
+            daemon.index_symbols([view.file_name()])
+
+
+class DocumentListener(getattr(sublime_plugin, 'TextChangeListener', object)):
+    """Record buffer changes for Jedi (Sublime Text 4 only)."""
+
+    def on_text_changed(self, changes):
+        mirror = _MIRRORS.get(self.buffer.id())
+        if mirror is not None:
+            mirror.record(changes, self.buffer.primary_view().change_count())
+
+    def on_close(self):
+        _forget_document(self.buffer.id())
+        _RESULTS.forget(self.buffer.id())
 
 
 class Daemon:
-    """Jedi Requester."""
+    """Jedi Requester.
+
+    Sends requests of a project to its Jedi worker process, or runs them
+    in the plugin host if workers are disabled or unavailable.
+    """
 
     def __init__(self, project_path, settings):
         """Prepare to call daemon.
 
         :type settings: dict
         """
-        environment_path = (
-            settings.get('python_interpreter') or
-            settings.get('python_virtualenv') or
-            None
-        )
+        self.project_path = project_path
+        self.settings = {key: settings.get(key) for key in ENGINE_SETTINGS}
+        self.last_used = time.time()
+        self._engine = None
+        # requests go to workers, until one can't run them
+        self._use_workers = _get_pool() is not None
+        if self._use_workers and not (
+                self.settings['python_interpreter'] or
+                self.settings['python_virtualenv']):
+            executable = _get_default_environment()
+            if executable is None:
+                logger.info(
+                    'Jedi uses the interpreter of the plugin host for {0}, '
+                    'running in plugin host.'.format(project_path))
+                self._use_workers = False
+            else:
+                self.settings['python_interpreter'] = executable
+
+    def close(self):
+        """Free the engine of the project in its worker or plugin host."""
+        if _POOL is not None:
+            _POOL.release(self.project_path)
+        engine, self._engine = self._engine, None
+        if engine is not None:
+            engine.close()
+
+    def status(self):
+        """Describe the engine running in the plugin host, if any.
+
+        :rtype: dict
+        """
+        if self._engine is None:
+            return {}
+        return self._engine.status()
 
-        self.project = jedi.Project(
-            project_path,
-            environment_path=environment_path,
-            added_sys_path=settings.get('extra_packages') or [],
-        )
+    def index_symbols(self, paths=None):
+        """Update index of project definitions in background.
+
+        :type paths: list of str or None
+        """
+        self._call('index_symbols', (paths,), _ignore_answer)
+
+    def prewarm_cache(self, mode):
+        """Parse libraries of the project's environment into the cache in
+        background, progress is shown in the status bar of its views.
 
-        # how to autocomplete arguments
-        self.complete_funcargs = settings.get('complete_funcargs')
+        :type mode: str
+        """
+        self._call('prewarm_cache', (mode,), _ignore_answer)
+        sublime.set_timeout_async(
+            self._poll_prewarm_progress, PREWARM_PROGRESS_INTERVAL)
+
+    def _poll_prewarm_progress(self):
+        def _callback(progress):
+            sublime.set_timeout_async(
+                partial(self._show_prewarm_progress, progress), 0)
+
+        self._call('prewarm_progress', (), _callback)
+
+    def _show_prewarm_progress(self, progress):
+        with _DAEMONS_LOCK:
+            is_alive = DAEMONS.get(self.project_path) is self
+        prefix = os.path.join(self.project_path, '')
+        views = [
+            view for window in sublime.windows() for view in window.views()
+            if (view.file_name() or '').startswith(prefix)
+        ]
+        if progress is None or not is_alive:
+            for view in views:
+                view.erase_status(PREWARM_STATUS_KEY)
+            return
+
+        status = 'Jedi: caching libraries {0}/{1}'.format(*progress)
+        for view in views:
+            view.set_status(PREWARM_STATUS_KEY, status)
+        sublime.set_timeout_async(
+            self._poll_prewarm_progress, PREWARM_PROGRESS_INTERVAL)
+
+    def search_symbols(self, callback, query, limit=100):
+        """Find project definitions fuzzy matching query.
+
+        Callback is called with the answer in Sublime's async thread.
+        """
+        def _callback(answer, is_final=True):
+            sublime.set_timeout_async(
+                partial(callback, answer, is_final), 0)
+
+        self._call('search_symbols', (query, limit), _callback)
 
-    def request(
+    def request_async(
             self,
+            callback,
+            key,
+            generation,
             request_type,
             request_kwargs,
             filename,
-            source,
+            buffer_id,
+            document,
             line,
-            column):
-        """Send request to daemon process."""
-        logger.info('Sending request to daemon for "{0}"'.format(request_type))
-        logger.debug((request_type, request_kwargs, filename, line, column))
-
-        facade = JediFacade(
-            project=self.project,
-            complete_funcargs=self.complete_funcargs,
-            source=source,
-            line=line + 1,
-            column=column,
-            filename=filename,
+            column,
+            deadline=None,
+            partial_first=False,
+            resync=None):
+        """Send request to daemon process.
+
+        Callback is called with the answer in Sublime's async thread, or
+        with ``CANCELLED`` if Jedi stopped working on it, as it was
+        superseded by a newer generation of the key.
+        With ``partial_first`` callback is called with partial answers
+        first, as ``callback(answer, False)``, then with the final one.
+
+        :param resync: callable preparing the request data again with the
+            whole buffer, if the engine lost its copy of it.
+        """
+        def _callback(answer):
+            sublime.set_timeout_async(partial(callback, answer), 0)
+
+        self._send(
+            _callback,
+            key,
+            generation,
+            request_type,
+            request_kwargs,
+            filename,
+            buffer_id,
+            document,
+            line,
+            column,
+            deadline,
+            partial_first,
+            resync,
         )
 
-        answer = facade.get(request_type, request_kwargs)
-        logger.debug('Answer: {0}'.format(answer))
+    def _send(self, callback, key, generation, request_type, request_kwargs,
+              filename, buffer_id, document, line, column, deadline=None,
+              partial_first=False, resync=None):
+        logger.info('Sending request to daemon for "{0}"'.format(request_type))
 
-        return answer
+        def _send_again():
+            """Send the request with the whole buffer, only once."""
+            self._send(
+                callback, key, generation, request_type, request_kwargs,
+                *resync(), deadline=deadline, partial_first=partial_first)
+
+        pool = _get_pool() if self._use_workers else None
+        if pool is not None:
+            def _on_response(status, payload):
+                if status == STATUS_CANCELLED:
+                    callback(CANCELLED)
+                    return
+                if status == STATUS_UNAVAILABLE:
+                    self._fall_back(payload)
+                    sublime.set_timeout_async(partial(
+                        self._send, callback, key, generation, request_type,
+                        request_kwargs, filename, buffer_id, document, line,
+                        column, deadline, partial_first, resync), 0)
+                    return
+                if status == STATUS_OUT_OF_SYNC and resync is not None:
+                    logger.info('Jedi worker lost the buffer: {0}'.format(
+                        payload))
+                    sublime.set_timeout_async(_send_again, 0)
+                    return
+                if status == STATUS_PARTIAL:
+                    callback(payload, False)
+                    return
+                if status != STATUS_OK:
+                    logger.error('Jedi worker failed: {0}'.format(payload))
+                    # the worker may have missed the edits
+                    _forget_document(buffer_id)
+                    payload = None
+                callback(payload)
+
+            try:
+                pool.get_worker(self.project_path).send(
+                    'request',
+                    (key, generation, self.project_path, self.settings,
+                     request_type, request_kwargs, filename, buffer_id,
+                     document, line, column, deadline, partial_first),
+                    _on_response,
+                )
+                return
+            except WorkerUnavailable as e:
+                logger.error('Jedi worker unavailable: {0}'.format(e))
+
+        engine = self._get_engine()
+        try:
+            source, diff = engine.sync_document(buffer_id, document)
+        except DocumentOutOfSync as e:
+            _forget_document(buffer_id)
+            if resync is not None:
+                logger.info('Jedi engine lost the buffer: {0}'.format(e))
+                _send_again()
+                return
+            logger.error(e)
+            callback(None)
+            return
+        try:
+            answer = engine.request(
+                request_type, request_kwargs, filename, source, line, column,
+                is_cancelled=_LATEST.get_cancellation_check(key, generation),
+                diff=diff,
+                deadline=deadline,
+                on_partial=(
+                    partial(callback, is_final=False)
+                    if partial_first else None),
+            )
+        except RequestCancelled:
+            callback(CANCELLED)
+            return
+        callback(answer)
+
+    def _call(self, method, args, callback):
+        """Call method of the project engine in its worker, or in the plugin
+        host if workers are disabled or unavailable."""
+        pool = _get_pool() if self._use_workers else None
+        if pool is not None:
+            def _on_response(status, payload):
+                if status == STATUS_UNAVAILABLE:
+                    self._fall_back(payload)
+                    sublime.set_timeout_async(
+                        partial(self._call, method, args, callback), 0)
+                    return
+                if status != STATUS_OK:
+                    logger.error('Jedi worker failed: {0}'.format(payload))
+                    payload = None
+                callback(payload)
+
+            try:
+                pool.get_worker(self.project_path).send(
+                    method,
+                    (self.project_path, self.settings) + args,
+                    _on_response,
+                )
+                return
+            except WorkerUnavailable as e:
+                logger.error('Jedi worker unavailable: {0}'.format(e))
+
+        callback(getattr(self._get_engine(), method)(*args))
+
+    def _fall_back(self, error):
+        """Run requests of the project in the plugin host from now on."""
+        logger.error('Jedi worker unavailable, running in plugin host: '
+                     '{0}'.format(error))
+        self._use_workers = False
+
+    def _get_engine(self):
+        if self._engine is None:
+            self._engine = Engine(self.project_path, self.settings)
+        return self._engine
+
+
+def _ignore_answer(answer):
+    pass
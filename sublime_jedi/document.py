@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""Engine side copy of Sublime Text buffers.
+
+The plugin sends a buffer as one of::
+
+    ('full', version, text)
+    ('edits', base_version, version, [(row_a, col_a, row_b, col_b, text)],
+     size)
+
+where version is ``view.change_count()``, edits are ``TextChange``
+replacements, applied one after another, and size is ``view.size()`` to
+catch edits that went astray.
+"""
+import re
+
+# line breaks of parso, that Sublime Text doesn't treat as a new row
+_IRREGULAR_BREAKS = re.compile(
+    r'[\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]')
+
+
+class DocumentOutOfSync(Exception):
+    """Edits are based on a version the engine doesn't have."""
+
+
+class Document:
+    """Buffer text as a list of rows (with line endings)."""
+
+    def __init__(self):
+        self.version = None
+        self.rows = ['']
+        # rows are the same as parso lines
+        self.regular = True
+
+    @property
+    def text(self):
+        return ''.join(self.rows)
+
+    def update(self, document):
+        """Update text to the new version.
+
+        Returns diff for parso when changed rows are known:
+        ``(old_rows, new_rows, opcodes)`` with ``SequenceMatcher`` alike
+        opcodes.
+
+        :type document: tuple
+        :raises DocumentOutOfSync: edits don't match the current version
+        :rtype: tuple or None
+        """
+        if document[0] == 'full':
+            _, self.version, text = document
+            self.rows = split_rows(text)
+            self.regular = not _IRREGULAR_BREAKS.search(text)
+            return None
+
+        _, base_version, version, edits, size = document
+        if base_version != self.version:
+            raise DocumentOutOfSync(
+                'Got edits of {0}, but have {1}'.format(
+                    base_version, self.version))
+        if not edits:
+            self.version = version
+            return None
+
+        old_rows = self.rows
+        rows = list(old_rows)
+        regular = self.regular
+        # number of unchanged rows at the beginning and the end
+        head = tail = len(rows)
+        for row_a, col_a, row_b, col_b, text in edits:
+            if not row_a <= row_b < len(rows):
+                raise DocumentOutOfSync(
+                    'Edit of rows {0}-{1} is out of range'.format(
+                        row_a, row_b))
+            if _IRREGULAR_BREAKS.search(text):
+                regular = False
+            replacement = split_rows(
+                rows[row_a][:col_a] + text + rows[row_b][col_b:])
+            if row_b < len(rows) - 1:
+                # the row ends with a line break, drop the empty row after it
+                replacement.pop()
+            head = min(head, row_a)
+            tail = min(tail, len(rows) - 1 - row_b)
+            rows[row_a:row_b + 1] = replacement
+
+        if sum(map(len, rows)) != size:
+            raise DocumentOutOfSync(
+                'Edited text has {0} characters instead of {1}'.format(
+                    sum(map(len, rows)), size))
+
+        self.rows = rows
+        self.version = version
+        self.regular = regular
+        if not regular:
+            return None
+        tail = min(tail, len(old_rows) - head, len(rows) - head)
+        return old_rows, rows, _get_opcodes(
+            len(old_rows), len(rows), head, tail)
+
+
+def split_rows(text):
+    """Split text into rows the way Sublime Text does, keeping line breaks.
+
+    :rtype: list of str
+    """
+    rows = text.split('\n')
+    for index in range(len(rows) - 1):
+        rows[index] += '\n'
+    return rows
+
+
+def _get_opcodes(old_count, new_count, head, tail):
+    opcodes = []
+    if head:
+        opcodes.append(('equal', 0, head, 0, head))
+
+    old_end, new_end = old_count - tail, new_count - tail
+    if head < old_end and head < new_end:
+        opcodes.append(('replace', head, old_end, head, new_end))
+    elif head < new_end:
+        opcodes.append(('insert', head, head, head, new_end))
+    elif head < old_end:
+        opcodes.append(('delete', head, old_end, head, head))
+
+    if tail:
+        opcodes.append(('equal', old_end, old_count, new_end, new_count))
+    return opcodes
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+import logging
+from collections import OrderedDict
+
+import jedi
+import parso.cache
+from jedi.inference import InferenceState
+from jedi.inference.gradual.typeshed import _get_typeshed_directories
+
+from .document import Document
+from .facade import JediFacade
+from .prewarm import CacheWarmer
+from .session import DeadlineExceeded, InferenceSession, RequestCancelled
+from .stats import get_memory_usage
+from .symbols import SymbolIndex
+
+logger = logging.getLogger(__name__)
+
+# plugin settings the engine depends on
+ENGINE_SETTINGS = (
+    'python_interpreter',
+    'python_virtualenv',
+    'extra_packages',
+    'complete_funcargs',
+    'folder_exclude_patterns',
+    'parser_cache_budget',
+)
+
+
+class Engine:
+    """Jedi engine of a single project.
+
+    Runs either in a worker process or, as a fallback, in the plugin host.
+    """
+
+    # how many buffers are mirrored
+    MAX_DOCUMENTS = 20
+
+    def __init__(self, project_path, settings):
+        """Prepare Jedi project.
+
+        :type settings: dict
+        """
+        environment_path = (
+            settings.get('python_interpreter') or
+            settings.get('python_virtualenv') or
+            None
+        )
+
+        self.project = jedi.Project(
+            project_path,
+            environment_path=environment_path,
+            added_sys_path=settings.get('extra_packages') or [],
+            folder_exclude_patterns=(
+                settings.get('folder_exclude_patterns') or []),
+        )
+
+        # keeps inference results warm between requests
+        self.session = InferenceSession(self.project)
+
+        # how to autocomplete arguments
+        self.complete_funcargs = settings.get('complete_funcargs')
+
+        # parsed modules are cached for all engines of the process
+        budget = settings.get('parser_cache_budget')
+        if budget:
+            parso.cache.set_memory_budget(budget * 1024 * 1024)
+
+        self._documents = OrderedDict()  # buffer id -> Document
+        self._symbols = None
+        self._warmer = None
+        # requests being processed, warming the cache waits for them
+        self._running = 0
+
+    def close(self):
+        """Free caches and the interpreter subprocess of the project."""
+        self.session.reset()
+        self._documents.clear()
+        self._symbols = None
+        if self._warmer is not None:
+            self._warmer.stop()
+        subprocess = self._get_own_subprocess()
+        if subprocess is not None:
+            subprocess._kill()
+
+    def status(self):
+        """Describe what the engine keeps alive.
+
+        :rtype: dict
+        """
+        subprocess = self._get_own_subprocess()
+        return {
+            'documents': len(self._documents),
+            'modules': self.session.module_count,
+            'indexed_files': (
+                self._symbols.file_count if self._symbols is not None else 0),
+            'interpreter_memory': (
+                get_memory_usage(subprocess._get_process().pid)
+                if subprocess is not None else None
+            ),
+        }
+
+    def _get_own_subprocess(self):
+        """Get running interpreter subprocess, unless it's shared.
+
+        The default environment and its subprocess are shared by all
+        projects without ``python_interpreter`` or ``python_virtualenv``.
+        """
+        if self.project._environment_path is None:
+            return None
+        subprocess = getattr(self.project._environment, '_subprocess', None)
+        # the process is started lazily by the first call
+        if (subprocess is None or subprocess.is_crashed or
+                not hasattr(subprocess, '_stderr_thread')):
+            return None
+        return subprocess
+
+    def index_symbols(self, paths=None):
+        """Update index of project definitions in background.
+
+        :param paths: changed files, all files of the project if None
+        :type paths: list of str or None
+        """
+        if self._symbols is None:
+            self._symbols = SymbolIndex(
+                self.project._path,
+                folder_excludes=self.project._get_folder_excludes(),
+                grammar=self.project.get_environment().get_grammar())
+            paths = None
+        self._symbols.update(paths)
+
+    def prewarm_cache(self, mode='imports'):
+        """Parse libraries of the environment into parso's cache in
+        background, see :class:`CacheWarmer`.
+
+        Only a worker parses in processes, the plugin host doesn't warm.
+
+        :type mode: str
+        """
+        if self._warmer is not None and self._warmer.is_running:
+            return
+        if not jedi.settings.parse_processes:
+            return
+        inference_state = InferenceState(self.project)
+        # stubs of typeshed bundled with Jedi are parsed for libraries too
+        typeshed = _get_typeshed_directories(
+            inference_state.environment.version_info)
+        self._warmer = CacheWarmer(
+            self.project._path,
+            list(typeshed) + self.project._get_sys_path(
+                inference_state, add_parent_paths=False),
+            inference_state.grammar,
+            inference_state.latest_grammar,
+            mode=mode,
+            folder_excludes=self.project._get_folder_excludes(),
+            is_busy=lambda: self._running > 0,
+        )
+        self._warmer.start()
+
+    def prewarm_progress(self):
+        """Get files warmed and found so far, None if not warming.
+
+        :rtype: (int, int) or None
+        """
+        if self._warmer is None:
+            return None
+        return self._warmer.progress()
+
+    def search_symbols(self, query, limit=100):
+        """Find project definitions fuzzy matching query.
+
+        Returns symbols, see :class:`SymbolIndex`, and if all files of the
+        project are indexed yet.
+
+        :type query: str
+        :rtype: (list of tuple, bool)
+        """
+        if self._symbols is None:
+            self.index_symbols()
+        return self._symbols.search(query, limit), self._symbols.is_complete
+
+    def sync_document(self, buffer_id, document):
+        """Bring the mirror of a buffer up to date.
+
+        Returns the current source and the diff of changed lines, if known.
+
+        :type document: tuple
+        :raises DocumentOutOfSync: the engine misses the edited version
+        :rtype: (str, tuple or None)
+        """
+        mirror = self._documents.pop(buffer_id, None)
+        if mirror is None:
+            mirror = Document()
+        try:
+            diff = mirror.update(document)
+        finally:
+            self._documents[buffer_id] = mirror
+            while len(self._documents) > self.MAX_DOCUMENTS:
+                self._documents.popitem(last=False)
+        return mirror.text, diff
+
+    def request(
+            self,
+            request_type,
+            request_kwargs,
+            filename,
+            source,
+            line,
+            column,
+            is_cancelled=None,
+            diff=None,
+            deadline=None,
+            on_partial=None):
+        """Run Jedi request.
+
+        :param is_cancelled: callable telling if the request is superseded,
+            then :class:`RequestCancelled` is raised.
+        :param diff: changed lines of the source, see :meth:`sync_document`.
+        :param deadline: time, when a partial answer (if the request type
+            has one) is due.
+        :param on_partial: callable to pass the partial answer to, before
+            inference starts. Without it the partial answer is returned, if
+            the deadline passes.
+        """
+        logger.info('Processing request "{0}"'.format(request_type))
+        logger.debug((request_type, request_kwargs, filename, line, column))
+
+        self._running += 1
+        try:
+            facade = JediFacade(
+                project=self.project,
+                complete_funcargs=self.complete_funcargs,
+                source=source,
+                line=line + 1,
+                column=column,
+                filename=filename,
+                session=self.session,
+                is_cancelled=is_cancelled,
+                diff=diff,
+                deadline=deadline,
+                on_partial=on_partial,
+            )
+            answer = facade.get(request_type, **request_kwargs)
+        except DeadlineExceeded as e:
+            logger.info('Request "{0}" timed out'.format(request_type))
+            self.session.abandon()
+            return e.answer
+        except RequestCancelled:
+            logger.info('Request "{0}" cancelled'.format(request_type))
+            self.session.abandon()
+            raise
+        finally:
+            self._running -= 1
+        logger.debug('Answer: {0}'.format(answer))
+
+        return answer
@@ -1,14 +1,37 @@
 # -*- coding: utf-8 -*-
+import time
+import logging
 from itertools import chain
 from operator import itemgetter
 
 import jedi
-from jedi.api.completion import Parameter
+from jedi.api import classes, helpers
+from jedi.api.completion import Completion, Parameter
+from jedi.inference.references import iter_references
 
-from .console_logging import getLogger
-from .utils import unique
+from . import stats
+from .common import unique
+from .local_usages import find_local_usages
+from .session import DeadlineExceeded, RequestCancelled
+from .syntactic import complete_syntactically
 
-logger = getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+
+@helpers.validate_line_column
+def _complete(script, line, column, get_signatures):
+    """``Script.complete`` with fuzzy matching and own call signatures.
+
+    :rtype: list of jedi.api.classes.Completion
+    """
+    return Completion(
+        script._inference_state,
+        script._get_module_context(),
+        script._code_lines,
+        (line, column),
+        get_signatures,
+        fuzzy=True,
+    ).complete()
 
 
 class JediFacade:
@@ -22,9 +45,17 @@ class JediFacade:
      goto         | get_goto
     -------------------------------
      usages       | get_usages
+    -------------------------------
+     local_usages | get_local_usages
     -------------------------------
      funcargs     | get_funcargs
     --------------------------------
+
+    Actions may have a partial answer known without inference, computed by
+    ``get_partial_<action>``. It's given to ``on_partial`` before the
+    inference starts, so the user sees something right away. Without
+    ``on_partial``, and when the action isn't done by ``deadline``, it
+    becomes the answer. Actions without partial answers just take longer.
     """
     def __init__(
         self,
@@ -33,32 +64,95 @@ class JediFacade:
         source,
         line,
         column,
-        filename=''
+        filename='',
+        session=None,
+        is_cancelled=None,
+        diff=None,
+        deadline=None,
+        on_partial=None
     ):
         filename = filename or None
-        self.script = jedi.Script(
-            source=source,
-            path=filename,
-            project=project,
-        )
+        self._deadline = deadline
+        self._on_partial = on_partial
+        self._action = None
+        if session is not None:
+            if deadline is not None:
+                is_cancelled = self._get_deadline_check(is_cancelled)
+            self.script = session.script(
+                source, filename, is_cancelled, diff)
+        else:
+            self.script = jedi.Script(
+                source=source,
+                path=filename,
+                project=project,
+            )
         self._line = line
         self._column = column
         self.auto_complete_function_params = complete_funcargs
 
     def get(self, _action, *args, **kwargs):
         """Action dispatcher."""
+        self._action = _action
+        get_partial = getattr(self, 'get_partial_' + _action, None)
         try:
+            if self._on_partial is not None and get_partial is not None:
+                self._on_partial(get_partial())
             return getattr(self, 'get_' + _action)(*args, **kwargs)
+        except RequestCancelled:
+            raise
         except Exception:
             logger.exception('`JediFacade.get_{0}` failed'.format(_action))
 
+    def _get_deadline_check(self, is_cancelled):
+        """Wrap cancellation check to also watch the deadline."""
+        def check():
+            if (self._deadline is not None and
+                    time.time() > self._deadline):
+                self._deadline = None
+                self._on_deadline()
+            return is_cancelled is not None and is_cancelled()
+        return check
+
+    def _on_deadline(self):
+        stats.increment('timeout', self._action)
+        get_partial = getattr(self, 'get_partial_' + self._action, None)
+        if get_partial is not None:
+            # a pushed partial answer is final now
+            raise DeadlineExceeded(get_partial())
+
     def get_goto(self, follow_imports=True):
         """ Jedi "Go To Definition" """
         return self._goto(follow_imports=follow_imports)
 
-    def get_usages(self, *args, **kwargs):
-        """ Jedi "Find Usage" """
-        return self._usages()
+    def get_usages(self, file_limit=None, *args, **kwargs):
+        """ Jedi "Find Usage"
+
+        With ``on_partial`` usages are pushed as ``(usages, False)`` as soon
+        as modules are searched, and the answer is ``(all usages, True)``.
+
+        :param file_limit: how many other modules containing the name may
+            be parsed, Jedi's default if None
+        """
+        usages = []
+        for batch in self._iter_usages(file_limit):
+            usages.extend(batch)
+            if batch and self._on_partial is not None:
+                self._on_partial((batch, False))
+        usages.sort(key=lambda u: (u[0] or '', u[1] or 0, u[2]))
+        if self._on_partial is not None:
+            return usages, True
+        return usages
+
+    def get_local_usages(self, *args, **kwargs):
+        """Usages in the current module, found without inference.
+
+        :rtype: list of (str, int, int)
+        """
+        return [
+            (self.script.path, line, column + 1)
+            for line, column in find_local_usages(
+                self.script._module_node, (self._line, self._column))
+        ]
 
     def get_funcargs(self, *args, **kwargs):
         """Complete callable object parameters with Jedi."""
@@ -69,13 +163,35 @@ class JediFacade:
         return ', '.join(p[1] for p in call_parameters)
 
     def get_autocomplete(self, *args, **kwargs):
-        """Jedi completion."""
+        """Jedi completion.
+
+        The call at position is inferred once, both for keyword arguments
+        of regular completions and for parameters of the call.
+        """
+        inferred = []
+
+        def get_signatures(line, column):
+            inferred[:] = [self.script.get_signatures(line, column)]
+            return inferred[0]
+
+        completions = list(self._completion(get_signatures))
         completions = chain(
-            self._complete_call_assigments(with_keywords=True),
-            self._completion()
+            self._complete_call_assigments(
+                with_keywords=True,
+                signatures=inferred[0] if inferred else None,
+            ),
+            completions
         )
         return list(unique(completions, itemgetter(0)))
 
+    def get_partial_autocomplete(self, *args, **kwargs):
+        """Completions known without inference, in a few milliseconds.
+
+        :rtype: list of (str, str)
+        """
+        return complete_syntactically(
+            self.script._module_node, (self._line, self._column))
+
     def get_docstring(self, *args, **kwargs):
         return self._docstring()
 
@@ -97,16 +213,16 @@ class JediFacade:
             else:
                 return defs[0].docstring()
 
-    def _completion(self):
+    def _completion(self, get_signatures):
         """Regular completions.
 
+        Call signatures are got by ``get_signatures(line, column)``, if
+        needed.
+
         :rtype: list of (str, str)
         """
-        completions = self.script.complete(
-            line=self._line,
-            column=self._column,
-            fuzzy=True,
-        )
+        completions = _complete(
+            self.script, self._line, self._column, get_signatures)
         for complete in completions:
             yield complete.name + '\t' + complete.type, complete.name
 
@@ -129,31 +245,41 @@ class JediFacade:
         return [(i.module_path, i.line, i.column + 1)
                 for i in definitions if not i.in_builtin_module()]
 
-    def _usages(self):
-        """Jedi "find usages" functionality.
+    def _iter_usages(self, file_limit):
+        """Jedi "find usages" functionality, usages are yielded per searched
+        module.
 
-        :rtype: list of (str, int, int)
+        :rtype: iterator of list of (str, int, int)
         """
-        usages = self.script.get_references(
-            line=self._line,
-            column=self._column,
-        )
-        return [
-            (i.module_path, i.line, i.column + 1)
-            for i in usages if not i.in_builtin_module()
-        ]
-
-    def _complete_call_assigments(self, with_keywords=True):
+        tree_name = self.script._module_node.get_name_of_position(
+            (self._line, self._column))
+        if tree_name is None:
+            return
+        names = iter_references(
+            self.script._get_module_context(), tree_name, file_limit)
+        for batch in names:
+            definitions = [
+                classes.Name(self.script._inference_state, n) for n in batch]
+            yield [
+                (i.module_path, i.line, i.column + 1)
+                for i in helpers.sorted_definitions(definitions)
+                if not i.in_builtin_module()
+            ]
+
+    def _complete_call_assigments(self, with_keywords=True, signatures=None):
         """Get function or class parameters and build Sublime Snippet string
         for completion
 
+        :param signatures: signatures of the call, if already inferred
         :rtype: str
         """
-        try:
-            call_definition = self.script.get_signatures(
+        if signatures is None:
+            signatures = self.script.get_signatures(
                 line=self._line,
                 column=self._column,
-            )[0]
+            )
+        try:
+            call_definition = signatures[0]
         except IndexError:
             # probably not a function/class call
             return
@@ -8,9 +8,10 @@ import sublime
 import sublime_plugin
 from functools import partial
 import re
+import time
 
 from .utils import to_relative_path, PythonCommandMixin, get_settings, is_python_scope, debounce
-from .daemon import ask_daemon
+from .daemon import ask_daemon, search_symbols
 from .settings import get_settings_param
 
 
@@ -158,91 +159,196 @@ class SublimeJediGoto(BaseLookUpJediCommand, sublime_plugin.TextCommand):
 class SublimeJediFindUsages(BaseLookUpJediCommand, sublime_plugin.TextCommand):
     """
     Find object usages, and optionally rename objects.
-    """
-    def run(self, edit):
-        self.edit = edit
-        ask_daemon(self.view, self.handle_usages, 'usages')
 
-    def handle_usages(self, view, options) -> None:
-        if not options:
-            return
+    The quick panel is shown right away and filled in when the search is
+    done. Usages found meanwhile are counted in the status bar, and shown
+    if the first line is chosen, reopening the panel would reset what the
+    user typed into it.
+    """
 
-        active_window = view.window()
+    # the shown panel, callbacks of older ones are ignored
+    panel = 0
 
-        # remember filenames
-        self.options = options
+    def run(self, edit):
+        self.edit = edit
+        self.options = []  # type: List[Tuple[str, int, int]]
+        self.is_complete = False
 
         # remember current file location
         self.point = self.view.sel()[0]
 
         # expands selection to all of "focused" symbol
-        name = expand_selection(self.view, self.point)
-
-        def handle_rename(new_name: str) -> None:
-            groups = []  # type: List[List[Tuple[str, int, int]]]
-            files = set()  # type: Set[str]
-
-            for option in options:
-                file = option[0]
-                if not file:  # can't replace text (or even show usages) in unsaved file
-                    continue
-                if file in files:
-                    groups[-1].append(option)
-                else:
-                    groups.append([option])
-                files.add(file)
-
-            for group in groups:
-                rename_in_file(group, group[0][0], new_name)
-
-        def rename_in_file(group, file_, new_name):
-            # type: (List[Tuple[str, int, int]], str, str) -> None
-            with open(file_) as f:
-                text = f.read()
-            original_text = text
-            offset = 0
-
-            for option in group:
-                assert text and name
-                _, row, col = option
-                point = text_point(original_text, row-1, col-1)
-
-                text = text[:point + offset] + new_name + text[point + offset + len(name):]
-                offset += len(new_name) - len(name)
-
-            with open(file_, "w") as f:
-                f.write(text)
-
-        def handle_choose(idx):
-            if not name:
-                return
-            if idx == 0:
-                view.window().show_input_panel("New name:", name, handle_rename, None, None)
-                return
-            self._jump_to_in_window(idx - 1 if idx != -1 else idx)
+        self.name = expand_selection(self.view, self.point)
 
-        def handle_highlight(idx):
-            if idx == 0:
-                return
-            self._jump_to_in_window(idx - 1 if idx != -1 else idx, transient=True)
+        self.is_closed = False
+        self.selected = 0
+
+        ask_daemon(
+            self.view,
+            self.handle_usages,
+            'usages',
+            ask_kwargs={
+                'file_limit': get_settings(self.view)['usages_file_limit'],
+            },
+            partial_first=True,
+        )
+        sublime.status_message(
+            'Jedi: searching usages of "{}"…'.format(self.name))
+        self.show_usages(self.view)
+
+    def handle_usages(self, view, answer) -> None:
+        if self.is_closed:
+            return
+        if answer is None:
+            self.is_complete = True
+        else:
+            usages, self.is_complete = answer
+            if self.is_complete:
+                self.options = usages
+            else:
+                self.options.extend(usages)
+
+        if not self.is_complete:
+            sublime.status_message(
+                'Jedi: searching usages of "{}", found {} so far…'.format(
+                    self.name, len(self.options)))
+            return
+        if not self.options:
+            self.is_closed = True
+            view.window().run_command('hide_overlay')
+            sublime.status_message(
+                'Jedi: No usages of "{}" found'.format(self.name))
+            return
+        sublime.status_message('Jedi: found {} usage{}'.format(
+            len(self.options), 's' if len(self.options) != 1 else ''))
+        self.show_usages(view)
+
+    def show_usages(self, view) -> None:
+        if self.is_closed:
+            return
+        self.panel += 1
+
+        files = {option[0] for option in self.options}  # type: Set[str]
+        summary = "{} occurrence{} in {} file{}".format(
+            len(self.options), 's' if len(self.options) != 1 else '',
+            len(files), 's' if len(files) != 1 else '')
+        if self.is_complete:
+            first_option = [['rename "{}"'.format(self.name), summary]]
+        else:
+            first_option = [
+                ['searching usages of "{}"…'.format(self.name), summary]]
 
         # Show the user a selection of filenames
-        files = {option[0] for option in options}  # type: Set[str]
-        first_option = [[
-            'rename "{}"'.format(name),
-            "{} occurrence{} in {} file{}".format(
-                len(options), 's' if len(options) != 1 else '', len(files), 's' if len(files) != 1 else '')
-        ]]
-        active_window.show_quick_panel(
-            first_option + [self.prepare_option(o) for o in options],
-            handle_choose,
-            on_highlight=handle_highlight)
+        view.window().show_quick_panel(
+            first_option + [self.prepare_option(o) for o in self.options],
+            partial(self.handle_choose, view, self.panel),
+            selected_index=self.selected,
+            on_highlight=partial(self.handle_highlight, self.panel))
+
+    def handle_choose(self, view, panel, idx):
+        if panel != self.panel:
+            # closed to show more usages
+            return
+        if idx == 0 and not self.is_complete:
+            # nothing to rename yet, keep searching
+            self.show_usages(view)
+            return
+        self.is_closed = True
+        if not self.name:
+            return
+        if idx == 0:
+            view.window().show_input_panel(
+                "New name:", self.name, self.handle_rename, None, None)
+            return
+        self._jump_to_in_window(idx - 1 if idx != -1 else idx)
+
+    def handle_highlight(self, panel, idx):
+        if panel != self.panel:
+            return
+        self.selected = idx
+        if idx == 0:
+            return
+        self._jump_to_in_window(idx - 1 if idx != -1 else idx, transient=True)
+
+    def handle_rename(self, new_name: str) -> None:
+        groups = []  # type: List[List[Tuple[str, int, int]]]
+        files = set()  # type: Set[str]
+
+        for option in self.options:
+            file = option[0]
+            if not file:  # can't replace text (or even show usages) in unsaved file
+                continue
+            if file in files:
+                groups[-1].append(option)
+            else:
+                groups.append([option])
+            files.add(file)
+
+        for group in groups:
+            self.rename_in_file(group, group[0][0], new_name)
+
+    def rename_in_file(self, group, file_, new_name):
+        # type: (List[Tuple[str, int, int]], str, str) -> None
+        with open(file_) as f:
+            text = f.read()
+        original_text = text
+        offset = 0
+
+        for option in group:
+            assert text and self.name
+            _, row, col = option
+            point = text_point(original_text, row-1, col-1)
+
+            text = text[:point + offset] + new_name + text[point + offset + len(self.name):]
+            offset += len(new_name) - len(self.name)
+
+        with open(file_, "w") as f:
+            f.write(text)
 
     def prepare_option(self, option):
         return [to_relative_path(option[0]),
                 "line: %d column: %d" % (option[1], option[2])]
 
 
+class SublimeJediGotoSymbol(BaseLookUpJediCommand, sublime_plugin.TextCommand):
+    """
+    Go to a definition anywhere in the project by its name
+    """
+    def run(self, edit):
+        self.view.window().show_input_panel(
+            'Goto Symbol in Project:',
+            expand_selection(self.view, self.view.sel()[0]),
+            self.search,
+            None,
+            None,
+        )
+
+    def search(self, query):
+        search_symbols(self.view, self.handle_symbols, query)
+
+    def handle_symbols(self, view, result):
+        if result is None:
+            return
+        symbols, is_complete = result
+        if not is_complete:
+            sublime.status_message('Jedi: the project is still being indexed')
+        if not symbols:
+            if is_complete:
+                sublime.status_message('Jedi: No results!')
+            return
+        self.names = {}
+        options = []
+        for _, full_name, _, path, line, column in symbols:
+            option = (path, line, column + 1)
+            self.names[option] = full_name
+            options.append(option)
+        self._window_quick_panel_open_window(view, options)
+
+    def prepare_option(self, option):
+        return [self.names[option],
+                '{0}:{1}'.format(to_relative_path(option[0]), option[1])]
+
+
 def expand_selection(view, point):
     # type: (Any, Any) -> str
     name = ""
@@ -264,24 +370,47 @@ def text_point(text: str, row: int, col: int) -> int:
     return chars + col
 
 
+# highlighted usages per view id: (change count, regions of usages)
+_HIGHLIGHTED = {}
+
+
 class SublimeJediEventListener(sublime_plugin.EventListener):
 
     def on_selection_modified_async(self, view) -> None:
-        should_highlight = get_settings_param(view, 'highlight_usages_on_select')
-        if not view.file_name() or not is_python_scope(view, view.sel()[0].begin()) or not should_highlight:
+        if not view.file_name() or not is_python_scope(view, view.sel()[0].begin()):
+            return
+        if not get_settings(view)['highlight_usages_on_select']:
+            return
+        if is_highlighted(view, view.sel()[0].begin()):
             return
         highlight_usages(view)
 
+    def on_close(self, view) -> None:
+        _HIGHLIGHTED.pop(view.id(), None)
+
+
+def is_highlighted(view, point):
+    # type: (Any, int) -> bool
+    """Check if usages of the name at point are already highlighted."""
+    try:
+        change_count, regions = _HIGHLIGHTED[view.id()]
+    except KeyError:
+        return False
+    return change_count == view.change_count() and any(
+        begin <= point <= end for begin, end in regions)
+
 
 @debounce(0.35)
 def highlight_usages(view) -> None:
-    ask_daemon(view, handle_highlight_usages, 'usages')
+    # usages in other files are not highlighted, so don't look for them
+    ask_daemon(view, handle_highlight_usages, 'local_usages')
 
 
 def handle_highlight_usages(view, options):
     # type: (Any, List[Tuple[str, int, int]]) -> None
     name = expand_selection(view, view.sel()[0])
     file_name = view.file_name()
+    options = options or []
 
     def get_region(o):
         # type: (Tuple[str, int, int]) -> Any
@@ -290,12 +419,18 @@ def handle_highlight_usages(view, options):
         return sublime.Region(point, point + len(name))
 
     regions = [get_region(o) for o in options if o[0] == file_name]
+    # the name under the caret is remembered even if it has no usages
+    word = view.word(view.sel()[0].begin())
+    _HIGHLIGHTED[view.id()] = (
+        view.change_count(),
+        [(r.begin(), r.end()) for r in regions + [word]],
+    )
 
     if not regions:
         view.erase_regions('sublime-jedi-usages')
         return
 
-    highlight_color = get_settings_param(view, 'highlight_usages_color')
+    highlight_color = get_settings(view)['highlight_usages_color']
 
     view.add_regions("sublime-jedi-usages", regions, highlight_color or "region.bluish",
                      flags=sublime.DRAW_NO_FILL | sublime.DRAW_NO_OUTLINE | sublime.DRAW_SOLID_UNDERLINE)
@@ -6,8 +6,9 @@ import sublime_plugin
 
 
 from .console_logging import getLogger
-from .daemon import ask_daemon
+from .daemon import ask_daemon, get_stats, get_status
 from .settings import get_plugin_settings
+from .stats import format_counters, format_memory
 from .utils import is_sublime_v2, PythonCommandMixin
 try:
     from .tooltips import show_docstring_tooltip
@@ -73,6 +74,56 @@ class SublimeJediSignature(PythonCommandMixin, sublime_plugin.TextCommand):
             sublime.status_message('Jedi: {0}'.format(signature))
 
 
+class SublimeJediStats(sublime_plugin.WindowCommand):
+    """Show request counters of the plugin host and Jedi workers."""
+
+    def run(self):
+        sublime.set_timeout_async(self._collect, 0)
+
+    def _collect(self):
+        report = '\n\n'.join(
+            '{0}\n{1}'.format(source, format_counters(counters))
+            for source, counters in get_stats()
+        )
+        sublime.set_timeout(
+            partial(show_docstring_panel, self.window.active_view(), report),
+            0
+        )
+
+
+class SublimeJediStatus(sublime_plugin.WindowCommand):
+    """Show live Jedi daemons and memory of the processes they use."""
+
+    def run(self):
+        sublime.set_timeout_async(self._collect, 0)
+
+    def _collect(self):
+        report = '\n\n'.join(
+            _format_status(source, status) for source, status in get_status()
+        )
+        sublime.set_timeout(
+            partial(show_docstring_panel, self.window.active_view(), report),
+            0
+        )
+
+
+def _format_status(source, status):
+    projects = status.get('daemons', status.get('engines', {}))
+    lines = ['{0}: {1} live, {2}'.format(
+        source, len(projects), format_memory(status['memory']))]
+    if 'parser_cache' in status:
+        size, budget = status['parser_cache']
+        lines.append('  parsed modules {0} of {1}'.format(
+            format_memory(size), format_memory(budget)))
+    for project_path, details in sorted(projects.items()):
+        lines.append('  ' + project_path)
+        for name, value in sorted(details.items()):
+            if name.endswith('memory'):
+                value = format_memory(value)
+            lines.append('    {0:<24} {1}'.format(name, value))
+    return '\n'.join(lines)
+
+
 class SublimeJediTooltip(sublime_plugin.EventListener):
     """EventListener to show jedi's docstring tooltip."""
 
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Usages of a name in its own module, found without inference.
+
+Highlighting usages needs only the current file, so instead of Jedi's
+project-wide references, names are resolved by Python scoping rules in
+the parsed module. Nothing is imported or read from disk.
+"""
+from jedi.parser_utils import get_parent_scope
+
+_SCOPES = ('file_input', 'classdef', 'funcdef', 'lambdef')
+
+
+def find_local_usages(module_node, position):
+    """Find usages of the name at position in the module.
+
+    Attributes can't be resolved without inference, so all attributes of
+    the same name (and class level definitions) are considered usages.
+
+    :type module_node: parso.python.tree.Module
+    :type position: (int, int)
+    :rtype: list of (int, int)
+    """
+    name = module_node.get_name_of_position(position)
+    if name is None or _is_keyword_argument(name):
+        return []
+
+    candidates = module_node.get_used_names().get(name.value, [])
+    if _is_attribute(name) or _is_class_attribute(name):
+        usages = [
+            n for n in candidates
+            if _is_attribute(n) or _is_class_attribute(n)
+        ]
+    else:
+        resolver = _ScopeResolver(module_node, candidates)
+        scope = resolver.resolve(name)
+        usages = [
+            n for n in candidates
+            if not _is_attribute(n) and
+            not _is_keyword_argument(n) and
+            resolver.resolve(n) is scope
+        ]
+    return [n.start_pos for n in usages]
+
+
+class _ScopeResolver:
+    """Find scopes, names of the same value are bound in."""
+
+    def __init__(self, module_node, names):
+        self._module_node = module_node
+        self._bound = set()
+        self._declared = {}  # scope -> 'global' or 'nonlocal'
+        for name in names:
+            parent_type = name.parent.type
+            if parent_type in ('global_stmt', 'nonlocal_stmt'):
+                self._declared[get_scope(name)] = parent_type
+            elif not _is_attribute(name) and name.is_definition():
+                self._bound.add(get_scope(name))
+
+    def resolve(self, name):
+        """Get scope the name is bound in, module if it's not bound.
+
+        :rtype: parso.python.tree.BaseNode
+        """
+        scope = get_scope(name)
+        is_own_scope = True
+        while scope is not self._module_node:
+            declared = self._declared.get(scope)
+            if declared == 'global_stmt':
+                return self._module_node
+            if declared == 'nonlocal_stmt':
+                is_own_scope = False
+            elif scope in self._bound and (
+                    is_own_scope or scope.type != 'classdef'):
+                return scope
+            # class bodies are not visible in nested functions
+            is_own_scope = False
+            scope = get_scope(scope)
+        return scope
+
+
+def get_scope(node):
+    # comprehensions are not scopes here, their variables rarely shadow
+    scope = get_parent_scope(node)
+    while scope.type not in _SCOPES:
+        scope = get_parent_scope(scope)
+    return scope
+
+
+def _is_attribute(name):
+    return name.parent.type == 'trailer' and name.get_previous_sibling() == '.'
+
+
+def _is_class_attribute(name):
+    return (
+        name.is_definition() and
+        get_scope(name).type == 'classdef' and
+        name.parent.type != 'classdef'
+    )
+
+
+def _is_keyword_argument(name):
+    return name.parent.type == 'argument' and name.get_next_sibling() == '='
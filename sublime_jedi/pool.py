@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import logging
+import threading
+import subprocess
+from collections import deque
+from itertools import count
+
+import parso
+from jedi._compatibility import GeneralizedPopen
+
+from .protocol import (
+    read_frame, write_frame, STATUS_ERROR, STATUS_PARTIAL, STATUS_UNAVAILABLE
+)
+
+logger = logging.getLogger(__name__)
+
+WORKER_MAIN_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'worker', '__main__.py')
+
+# the oldest Python Jedi runs on, the newest is the latest one parso has
+# a grammar of
+MIN_PYTHON_VERSION = (3, 5)
+VERSION_SCRIPT = 'import sys; print("%d.%d" % sys.version_info[:2])'
+# how long (in seconds) the interpreter may take to tell its version
+VERSION_TIMEOUT = 10
+
+# error of every checked interpreter, None if it's supported
+_CHECKED_EXECUTABLES = {}
+
+
+class WorkerUnavailable(Exception):
+    """Worker process can't be (re)started."""
+
+
+class WorkerProcess:
+    """Supervised Jedi worker process.
+
+    Responses, partial ones included, are passed to callbacks on the reader
+    thread as ``callback(status, payload)``. If the process dies, all
+    pending callbacks get ``STATUS_ERROR`` and the process is restarted on
+    the next request, unless it keeps crashing.
+    """
+
+    # restarts allowed within RESTART_WINDOW seconds
+    MAX_RESTARTS = 3
+    RESTART_WINDOW = 60
+
+    def __init__(self, executable, parse_processes=0):
+        self.executable = executable
+        # processes the worker parses files in, see jedi.settings
+        self.parse_processes = parse_processes
+        self.projects = set()
+        self._process = None
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._request_ids = count()
+        self._crashes = deque(maxlen=self.MAX_RESTARTS)
+
+    def __repr__(self):
+        return '<WorkerProcess {0} pid={1}>'.format(
+            self.executable, self._process and self._process.pid)
+
+    @property
+    def is_alive(self):
+        return self._process is not None and self._process.poll() is None
+
+    def send(self, method, args, callback):
+        """Send request to worker process.
+
+        :type method: str
+        :type args: tuple
+        :type callback: callable
+        :rtype: int
+        """
+        if not self.is_alive:
+            # it may take seconds the first time, other requests don't wait
+            check_executable(self.executable)
+        with self._lock:
+            if not self.is_alive:
+                self._start()
+            request_id = next(self._request_ids)
+            self._pending[request_id] = callback
+            try:
+                write_frame(self._process.stdin, (request_id, method, args))
+            except (OSError, ValueError):
+                # the reader thread will notice the exit and fail callbacks
+                logger.exception('Failed to send request to {0}'.format(self))
+        return request_id
+
+    def stop(self):
+        with self._lock:
+            process, self._process = self._process, None
+            pending, self._pending = self._pending, {}
+        if process is not None:
+            try:
+                process.stdin.close()
+                process.wait(timeout=1)
+            except Exception:
+                process.kill()
+        for callback in pending.values():
+            callback(STATUS_ERROR, 'Jedi worker stopped')
+
+    def _start(self):
+        now = time.time()
+        if (len(self._crashes) == self.MAX_RESTARTS and
+                now - self._crashes[0] < self.RESTART_WINDOW):
+            raise WorkerUnavailable(
+                '{0} crashed {1} times in {2} seconds'.format(
+                    self, self.MAX_RESTARTS, self.RESTART_WINDOW))
+
+        logger.info('Starting Jedi worker with {0}'.format(self.executable))
+        try:
+            process = GeneralizedPopen(
+                (self.executable, WORKER_MAIN_PATH,
+                 str(self.parse_processes)),
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except OSError as e:
+            self._crashes.append(now)
+            raise WorkerUnavailable(str(e))
+
+        self._process = process
+        for target in (self._read_responses, self._read_errors):
+            thread = threading.Thread(target=target, args=(process,))
+            thread.daemon = True
+            thread.start()
+
+    def _read_responses(self, process):
+        has_answered = False
+        while True:
+            try:
+                request_id, status, payload = read_frame(process.stdout)
+            except Exception:
+                break
+            has_answered = True
+            with self._lock:
+                if status == STATUS_PARTIAL:
+                    callback = self._pending.get(request_id)
+                else:
+                    callback = self._pending.pop(request_id, None)
+            if callback is not None:
+                callback(status, payload)
+        self._on_exit(process, has_answered)
+
+    def _read_errors(self, process):
+        for line in iter(process.stderr.readline, b''):
+            logger.warning(line.decode('utf-8', 'replace').rstrip())
+
+    def _on_exit(self, process, has_answered):
+        with self._lock:
+            if process is not self._process:
+                # stopped on purpose or already restarted
+                return
+            self._process = None
+            pending, self._pending = self._pending, {}
+            self._crashes.append(time.time())
+
+        logger.error('Jedi worker (pid {0}) exited with {1}'.format(
+            process.pid, process.wait()))
+        # a worker, which doesn't even start, can't run the requests
+        status = STATUS_ERROR if has_answered else STATUS_UNAVAILABLE
+        for callback in pending.values():
+            callback(status, 'Jedi worker exited')
+
+
+def check_executable(executable):
+    """Check that Jedi workers can run on the interpreter, once per
+    interpreter.
+
+    :raises WorkerUnavailable: the interpreter doesn't run or its version
+        isn't supported
+    """
+    try:
+        error = _CHECKED_EXECUTABLES[executable]
+    except KeyError:
+        error = _CHECKED_EXECUTABLES[executable] = _check_version(executable)
+    if error is not None:
+        raise WorkerUnavailable(error)
+
+
+def _check_version(executable):
+    """Get why the interpreter can't run workers, None if it can.
+
+    :rtype: str or None
+    """
+    try:
+        process = GeneralizedPopen(
+            (executable, '-c', VERSION_SCRIPT),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+        )
+        output, _ = process.communicate(timeout=VERSION_TIMEOUT)
+        version = tuple(int(part) for part in output.split(b'.'))
+    except subprocess.TimeoutExpired:
+        process.kill()
+        return '{0} didn\'t tell its version'.format(executable)
+    except (OSError, ValueError) as e:
+        return '{0} failed to tell its version: {1}'.format(executable, e)
+
+    error = 'Python {0}.{1} of {2} is not supported'.format(
+        version[0], version[1], executable)
+    if version < MIN_PYTHON_VERSION:
+        return error
+    try:
+        parso.load_grammar(version='{0}.{1}'.format(*version))
+    except NotImplementedError:
+        return error
+    return None
+
+
+class WorkerPool:
+    """Pool of Jedi worker processes.
+
+    Every project gets its own worker until ``size`` workers are running,
+    then projects share the least loaded worker.
+    """
+
+    def __init__(self, executable, size, parse_processes=0):
+        self.executable = executable
+        self.size = size
+        self.parse_processes = parse_processes
+        self._workers = []
+        self._assignments = {}
+        self._lock = threading.Lock()
+
+    @property
+    def workers(self):
+        with self._lock:
+            return list(self._workers)
+
+    def get_worker(self, project_path):
+        """Get worker assigned to project.
+
+        :rtype: WorkerProcess
+        """
+        with self._lock:
+            worker = self._assignments.get(project_path)
+            if worker is None:
+                if len(self._workers) < self.size:
+                    worker = WorkerProcess(
+                        self.executable, self.parse_processes)
+                    self._workers.append(worker)
+                else:
+                    worker = min(self._workers, key=lambda w: len(w.projects))
+                worker.projects.add(project_path)
+                self._assignments[project_path] = worker
+            return worker
+
+    def release(self, project_path):
+        """Let the worker of the project close its engine.
+
+        :type project_path: str
+        """
+        with self._lock:
+            worker = self._assignments.pop(project_path, None)
+            if worker is None:
+                return
+            worker.projects.discard(project_path)
+        if worker.is_alive:
+            worker.send('release', (project_path,), _ignore_response)
+
+    def shutdown(self):
+        with self._lock:
+            workers, self._workers = self._workers, []
+            self._assignments = {}
+        for worker in workers:
+            worker.stop()
+
+
+def _ignore_response(status, payload):
+    pass
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+"""Parsing of libraries into parso's file system cache in background.
+
+The first completion or goto into a heavy library has to parse its whole
+import chain. Libraries the project imports (found on the ``sys.path`` of
+its environment) are parsed ahead in the pool of parse processes, then the
+libraries those import, and so on. Jedi loads them from the cache later,
+which is about ten times faster than parsing.
+
+Files already cached are remembered with their modification time and size
+under Jedi's cache directory, so warming resumes where it stopped.
+"""
+import os
+import re
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from collections import deque
+
+from jedi import settings
+from jedi._compatibility import scandir
+from jedi.file_io import FolderIO
+from jedi.inference.parallel import parse_in_processes
+from jedi.inference.references import recurse_find_python_files
+
+logger = logging.getLogger(__name__)
+
+# bump when the format of the saved state changes
+STATE_VERSION = 1
+
+# absolute imports, the top level name of ``from`` imports and the names of
+# ``import`` statements (with dotted names and aliases)
+IMPORT = re.compile(
+    r'^[ \t]*(?:from[ \t]+(\w+)[\w.]*[ \t]+import\b|import[ \t]+([^#;\n]+))',
+    re.MULTILINE)
+
+# folders of packages, that are never imported
+SKIPPED_FOLDERS = frozenset(('__pycache__', 'test', 'tests'))
+
+
+class CacheWarmer:
+    """Parses libraries of a project's environment in background.
+
+    Modes are ``imports`` (libraries imported by the project, recursively)
+    and ``all`` (everything on ``sys.path`` after those).
+    """
+
+    # how many files are sent to the parse processes at once, per process
+    BATCH_SIZE = 4
+    # pause after a batch, relative to the time it took
+    THROTTLE = 1.0
+    # how often (in seconds) the state is saved
+    SAVE_INTERVAL = 30
+
+    def __init__(self, project_path, sys_path, grammar, stub_grammar,
+                 mode='imports', folder_excludes=None, is_busy=None,
+                 cache_path=None):
+        """
+        :param sys_path: folders of modules, which may be imported
+        :param grammar: grammar of the environment, for ``.py`` files
+        :param stub_grammar: grammar of ``.pyi`` files
+        :param is_busy: callable telling if requests are running, warming
+            waits for them
+        :type sys_path: list of str
+        :type mode: str
+        """
+        self.project_path = project_path
+        self.sys_path = [
+            path for path in sys_path
+            if path != project_path and
+            not path.startswith(os.path.join(project_path, ''))
+        ]
+        self.grammar = grammar
+        self.stub_grammar = stub_grammar
+        self.mode = mode
+        self.folder_excludes = folder_excludes
+        self.is_busy = is_busy or (lambda: False)
+        self.cache_path = cache_path or _get_cache_path(self.sys_path)
+        self.done_count = 0
+        self.total_count = 0
+        self._done = {}  # path -> (mtime, size)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def progress(self):
+        """Get files warmed and found so far, None when warming is over.
+
+        :rtype: (int, int) or None
+        """
+        if not self.is_running:
+            return None
+        return self.done_count, self.total_count
+
+    def _run(self):
+        started = time.time()
+        try:
+            self._load()
+            self._warm()
+        except Exception:
+            logger.exception('Warming cache of {0} failed'.format(
+                self.project_path))
+        finally:
+            self._save()
+        logger.info('Warmed cache of {0} files of {1} in {2:.2f}s'.format(
+            self.done_count, self.project_path, time.time() - started))
+
+    def _warm(self):
+        modules = _find_top_level_modules(self.sys_path)
+        queued = set()
+        queue = deque()
+
+        def enqueue(names):
+            for name in names:
+                if name in queued or name not in modules:
+                    continue
+                queued.add(name)
+                for path in modules[name]:
+                    files = list(_iter_module_files(path))
+                    self.total_count += len(files)
+                    queue.extend(files)
+
+        enqueue(self._find_project_imports())
+
+        saved_at = time.time()
+        batch_size = self.BATCH_SIZE * max(1, settings.parse_processes)
+        while not self._stopped.is_set():
+            if not queue:
+                if self.mode != 'all' or len(queued) == len(modules):
+                    return
+                # imported ones went first
+                enqueue(sorted(modules))
+            batch = []
+            while queue and len(batch) < batch_size:
+                path, stat = queue.popleft()
+                if self._done.get(path) == (stat.st_mtime, stat.st_size):
+                    self.done_count += 1
+                    # imports of libraries are found in their files, warm or
+                    # not
+                    enqueue(_find_imports(path))
+                else:
+                    batch.append((path, stat))
+            if not batch:
+                continue
+
+            while self.is_busy():
+                if self._stopped.wait(0.1):
+                    return
+            batch_started = time.time()
+            if not self._parse([path for path, _ in batch]):
+                logger.info('No parse processes, warming stopped')
+                return
+            for path, stat in batch:
+                self._done[path] = stat.st_mtime, stat.st_size
+                enqueue(_find_imports(path))
+            self.done_count += len(batch)
+
+            if time.time() - saved_at > self.SAVE_INTERVAL:
+                self._save()
+                saved_at = time.time()
+            self._stopped.wait((time.time() - batch_started) * self.THROTTLE)
+
+    def _parse(self, paths):
+        return (
+            parse_in_processes(
+                self.grammar, [p for p in paths if p.endswith('.py')]) and
+            parse_in_processes(
+                self.stub_grammar, [p for p in paths if p.endswith('.pyi')])
+        )
+
+    def _find_project_imports(self):
+        """Get top level names imported by the project, the most imported
+        first.
+
+        :rtype: list of str
+        """
+        counts = {}
+        for file_io in recurse_find_python_files(
+                FolderIO(self.project_path),
+                folder_excludes=self.folder_excludes):
+            if self._stopped.is_set():
+                break
+            for name in _find_imports(file_io.path):
+                counts[name] = counts.get(name, 0) + 1
+        return sorted(counts, key=lambda name: (-counts[name], name))
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'rb') as f:
+                version, sys_path, done = pickle.load(f)
+        except FileNotFoundError:
+            return
+        except Exception:
+            logger.exception('Failed to load {0}'.format(self.cache_path))
+            return
+        if version == STATE_VERSION and sys_path == self.sys_path:
+            self._done = done
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temporary = '{0}.{1}'.format(self.cache_path, os.getpid())
+            with open(temporary, 'wb') as f:
+                pickle.dump(
+                    (STATE_VERSION, self.sys_path, self._done), f,
+                    pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.cache_path)
+        except OSError:
+            logger.exception('Failed to save {0}'.format(self.cache_path))
+
+
+def _find_top_level_modules(sys_path):
+    """Get paths of top level modules and packages on sys.path by name.
+
+    Stub packages (``name-stubs``) are found under the name of the package.
+
+    :rtype: dict of (str, list of str)
+    """
+    modules = {}
+    for folder in sys_path:
+        try:
+            entries = list(scandir(folder))
+        except OSError:
+            continue
+        for entry in entries:
+            name = entry.name
+            if entry.is_dir():
+                if name.endswith('-stubs'):
+                    name = name[:-len('-stubs')]
+                if not name.isidentifier() or name in SKIPPED_FOLDERS:
+                    continue
+            else:
+                name, extension = os.path.splitext(name)
+                if extension not in ('.py', '.pyi') or \
+                        not name.isidentifier():
+                    continue
+            modules.setdefault(name, []).append(entry.path)
+    return modules
+
+
+def _iter_module_files(path):
+    """Yield python files of a module or package with their stat,
+    the ones closer to the top level first.
+
+    :rtype: iter of (str, os.stat_result)
+    """
+    if not os.path.isdir(path):
+        try:
+            yield path, os.stat(path)
+        except OSError:
+            pass
+        return
+
+    folders = deque([path])
+    while folders:
+        try:
+            entries = sorted(scandir(folders.popleft()), key=lambda e: e.name)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir() and not entry.is_symlink():
+                if entry.name.isidentifier() and \
+                        entry.name not in SKIPPED_FOLDERS:
+                    folders.append(entry.path)
+            elif entry.name.endswith(('.py', '.pyi')):
+                try:
+                    yield entry.path, entry.stat()
+                except OSError:
+                    pass
+
+
+def _find_imports(path):
+    """Get top level names of absolute imports of the file.
+
+    :rtype: set of str
+    """
+    try:
+        with open(path, 'rb') as f:
+            code = f.read().decode('utf-8', 'replace')
+    except OSError:
+        return set()
+    names = set()
+    for from_name, imported in IMPORT.findall(code):
+        if from_name:
+            names.add(from_name)
+            continue
+        for name in imported.split(','):
+            name = name.strip().split('.')[0].split(' ')[0]
+            if name.isidentifier():
+                names.add(name)
+    return names
+
+
+def _get_cache_path(sys_path):
+    key = hashlib.sha1(repr(sys_path).encode('utf-8', 'replace')).hexdigest()
+    return os.path.join(
+        settings.cache_directory, 'sublime_jedi', 'prewarm', key + '.pickle')
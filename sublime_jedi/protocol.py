@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""Framed protocol between the plugin and Jedi worker processes.
+
+Every message is a pickled tuple prefixed by its length::
+
+    request:  (request_id, method, args)
+    response: (request_id, status, payload)
+
+A request may get ``STATUS_PARTIAL`` responses before the final one.
+
+Jedi requests are keyed by ``(view id, request type)``, or by
+``(SPECULATIVE, view id, request type)`` if nobody waits for them yet, and
+numbered by generations growing across all keys.
+"""
+import time
+import pickle
+import struct
+import threading
+from functools import partial
+
+# the lowest protocol supported by both ST3 and ST4 plugin hosts
+PICKLE_PROTOCOL = 3
+
+HEADER = struct.Struct('!I')
+
+STATUS_OK = 'ok'
+STATUS_ERROR = 'error'
+# the request was superseded by a newer one of the same view and type
+STATUS_CANCELLED = 'cancelled'
+# answer known without inference, the final one follows
+STATUS_PARTIAL = 'partial'
+# the worker failed to start or to create the engine of the project, the
+# request should run in the plugin host
+STATUS_UNAVAILABLE = 'unavailable'
+# the worker doesn't have the version of the buffer the edits are based on,
+# the request has to be sent again with the whole text
+STATUS_OUT_OF_SYNC = 'out of sync'
+
+SPECULATIVE = 'speculative'
+# how long (in seconds) Jedi may work on a speculative request
+SPECULATIVE_BUDGET = 1.0
+
+
+def write_frame(stream, message):
+    """Serialize message and write it to binary stream.
+
+    :type message: tuple
+    """
+    data = pickle.dumps(message, protocol=PICKLE_PROTOCOL)
+    stream.write(HEADER.pack(len(data)) + data)
+    stream.flush()
+
+
+def read_frame(stream):
+    """Read one message from binary stream.
+
+    :raises EOFError: the stream was closed
+    :rtype: tuple
+    """
+    size, = HEADER.unpack(_read_exactly(stream, HEADER.size))
+    return pickle.loads(_read_exactly(stream, size))
+
+
+def _read_exactly(stream, size):
+    data = b''
+    while len(data) < size:
+        chunk = stream.read(size - len(data))
+        if not chunk:
+            raise EOFError('Stream closed')
+        data += chunk
+    return data
+
+
+class Generations:
+    """The latest generations of requests.
+
+    A request is superseded by a newer one of the same key. Speculative
+    requests are also superseded by any newer regular request, so they
+    never delay requests the user waits for.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._latest_regular = 0
+
+    def register(self, key, generation):
+        with self._lock:
+            if generation > self._latest.get(key, 0):
+                self._latest[key] = generation
+            if (not is_speculative(key) and
+                    generation > self._latest_regular):
+                self._latest_regular = generation
+
+    def is_superseded(self, key, generation):
+        if self._latest.get(key, generation) > generation:
+            return True
+        return is_speculative(key) and self._latest_regular > generation
+
+    def get_cancellation_check(self, key, generation):
+        """Get callable telling if Jedi should stop working on the request.
+
+        Speculative requests are also stopped after ``SPECULATIVE_BUDGET``.
+
+        :rtype: callable
+        """
+        if not is_speculative(key):
+            return partial(self.is_superseded, key, generation)
+
+        deadline = time.time() + SPECULATIVE_BUDGET
+
+        def is_cancelled():
+            return (
+                time.time() > deadline or
+                self.is_superseded(key, generation)
+            )
+        return is_cancelled
+
+
+def is_speculative(key):
+    return key is not None and key[0] == SPECULATIVE
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Answers of Jedi requests, that depend only on the buffer."""
+import threading
+from collections import OrderedDict
+
+
+class ResultCache:
+    """Least recently used answers per buffer.
+
+    Answers of a buffer are kept until its version (change count) changes.
+    """
+
+    def __init__(self, max_buffers=20, max_answers=32):
+        self.max_buffers = max_buffers
+        self.max_answers = max_answers
+        self._lock = threading.Lock()
+        self._buffers = OrderedDict()  # buffer id -> (version, answers)
+
+    def get(self, buffer_id, version, key):
+        """Get answer of the buffer version, None if it's not cached.
+
+        :type key: tuple
+        """
+        with self._lock:
+            answers = self._get_answers(buffer_id, version)
+            answer = answers.pop(key, None)
+            if answer is not None:
+                answers[key] = answer
+            return answer
+
+    def put(self, buffer_id, version, key, answer):
+        with self._lock:
+            answers = self._get_answers(buffer_id, version)
+            answers.pop(key, None)
+            answers[key] = answer
+            while len(answers) > self.max_answers:
+                answers.popitem(last=False)
+            while len(self._buffers) > self.max_buffers:
+                self._buffers.popitem(last=False)
+
+    def forget(self, buffer_id):
+        with self._lock:
+            self._buffers.pop(buffer_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._buffers.clear()
+
+    def _get_answers(self, buffer_id, version):
+        cached_version, answers = self._buffers.pop(
+            buffer_id, (version, OrderedDict()))
+        if cached_version != version:
+            answers = OrderedDict()
+        self._buffers[buffer_id] = version, answers
+        return answers
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+import os
+import time
+import logging
+
+import jedi
+from jedi.inference import InferenceState
+from parso.cache import parser_cache, try_to_save_module
+from parso.file_io import KnownContentFileIO
+from jedi.inference.base_value import (
+    ContextualizedNode, HelperValueMixin, ValueSet
+)
+from jedi.inference.context import AbstractContext
+from jedi.inference.names import AbstractNameDefinition
+from jedi.inference.recursion import ExecutionRecursionDetector
+
+logger = logging.getLogger(__name__)
+
+
+class RequestCancelled(Exception):
+    """Request was superseded while Jedi was working on it."""
+
+
+class DeadlineExceeded(RequestCancelled):
+    """Request ran out of time, ``answer`` is what is known so far."""
+
+    def __init__(self, answer):
+        super().__init__()
+        self.answer = answer
+
+
+class InferenceSession:
+    """Long-lived Jedi inference state shared by all requests of a project.
+
+    ``jedi.Script`` creates a new ``InferenceState`` on every call, so every
+    completion re-infers builtins, typing and typeshed from scratch. The
+    session keeps one state alive and before each request drops only what
+    can be out of date:
+
+    - memoized results that depend on project modules (including the
+      current buffer). Results that only involve library modules survive;
+    - project modules whose files changed on disk;
+    - everything, if a library module changed on disk (e.g. pip install).
+    """
+
+    # how often (in seconds) the files of loaded modules are checked
+    DISK_CHECK_INTERVAL = 2
+
+    def __init__(self, project):
+        """
+        :type project: jedi.Project
+        """
+        self.project = project
+        self._project_path = os.path.join(project._path, '')
+        self._inference_state = None
+        self._stable_memo = {}
+        self._root_stability = {}
+        self._mtimes = {}
+        self._last_disk_check = 0
+
+    @property
+    def module_count(self):
+        """Number of modules the warm inference state keeps."""
+        if self._inference_state is None:
+            return 0
+        return len(self._inference_state.module_cache._name_cache)
+
+    def script(self, source, filename=None, is_cancelled=None, diff=None):
+        """Create ``jedi.Script`` bound to the warm inference state.
+
+        If ``is_cancelled`` is given, inference checks it at safe points
+        (function executions and statements) and raises
+        :class:`RequestCancelled` as soon as it returns True.
+
+        ``diff`` is the result of :meth:`Document.update`, it tells the
+        parser which lines changed since the previous request, so parso
+        doesn't have to diff the whole file.
+
+        :type source: str
+        :type filename: str or None
+        :type is_cancelled: callable or None
+        :type diff: tuple or None
+        :rtype: jedi.Script
+        """
+        if diff is not None and filename:
+            self._apply_diff(os.path.abspath(filename), source, diff)
+        script = jedi.Script(
+            code=source,
+            path=filename or None,
+            project=self.project,
+        )
+        # Script is not "used" before the first API call, so its throwaway
+        # inference state can still be replaced by the warm one.
+        script._inference_state = self._prepare(script.path, is_cancelled)
+        return script
+
+    def abandon(self):
+        """Forget results of the interrupted request, they are incomplete."""
+        if self._inference_state is not None:
+            self._inference_state.memoize_cache = {}
+
+    def reset(self):
+        """Forget all cached inference results."""
+        self._inference_state = None
+        self._stable_memo = {}
+        self._root_stability = {}
+        self._mtimes = {}
+
+    def _apply_diff(self, path, source, diff):
+        """Update the cached module of the buffer with known changed lines.
+
+        ``jedi.Script`` then finds the cached lines equal to the source and
+        reuses the module.
+        """
+        if path.endswith('.pyi'):
+            return
+        grammar = self.project.get_environment().get_grammar()
+        try:
+            item = parser_cache[grammar._hashed][path]
+        except KeyError:
+            return
+        old_lines, lines, opcodes = diff
+        if item.lines is not old_lines and item.lines != old_lines:
+            # parsed from another source, e.g. cropped or read from disk
+            return
+
+        module = grammar._diff_parser(
+            grammar._pgen_grammar, grammar._tokenizer, item.node
+        ).update(old_lines, lines, opcodes=opcodes)
+        try_to_save_module(
+            grammar._hashed,
+            KnownContentFileIO(path, source),
+            module,
+            lines,
+            pickling=False,
+        )
+
+    def _prepare(self, script_path, is_cancelled):
+        if self._inference_state is not None:
+            self._harvest_stable_memo()
+            self._check_disk()
+
+        if self._inference_state is None:
+            logger.debug('Creating inference state for {0}'.format(
+                self.project._path))
+            self._inference_state = InferenceState(self.project)
+
+        state = self._inference_state
+        state.script_path = script_path
+        state.memoize_cache = {
+            function: dict(memo)
+            for function, memo in self._stable_memo.items()
+        }
+        state.inferred_element_counts = {}
+        state.analysis = []
+        state.reset_recursion_limitations()
+        if is_cancelled is not None:
+            _install_safe_points(state, is_cancelled)
+        return state
+
+    def _harvest_stable_memo(self):
+        """Keep memoized results that do not depend on project modules."""
+        for function, memo in self._inference_state.memoize_cache.items():
+            stable = self._stable_memo.setdefault(function, {})
+            for key in memo.keys() - stable.keys():
+                if self._is_stable_key(key):
+                    stable[key] = memo[key]
+        self._root_stability = {
+            root: is_stable
+            for root, is_stable in self._root_stability.items()
+            if is_stable
+        }
+
+    def _is_stable_key(self, key):
+        obj, args, _ = key
+        found_stable = False
+        for root in _iter_root_contexts((obj,) + args):
+            if not self._is_stable_root(root):
+                return False
+            found_stable = True
+        # keys without any module (e.g. the sys path of the current script)
+        # can't be proved to be stable
+        return found_stable
+
+    def _is_stable_root(self, root):
+        try:
+            return self._root_stability[root]
+        except KeyError:
+            pass
+        try:
+            if root.is_compiled():
+                is_stable = True
+            else:
+                is_stable = self._is_library_path(root.py__file__())
+        except Exception:
+            is_stable = False
+        self._root_stability[root] = is_stable
+        return is_stable
+
+    def _is_library_path(self, path):
+        if path is None:
+            return False
+        return (
+            not path.startswith(self._project_path) or
+            os.sep + 'site-packages' + os.sep in path or
+            os.sep + 'dist-packages' + os.sep in path
+        )
+
+    def _check_disk(self):
+        now = time.time()
+        if now - self._last_disk_check < self.DISK_CHECK_INTERVAL:
+            return
+        self._last_disk_check = now
+
+        name_cache = self._inference_state.module_cache._name_cache
+        for names, modules in list(name_cache.items()):
+            for module in modules:
+                path = module.py__file__()
+                if path is None:
+                    continue
+                try:
+                    mtime = os.path.getmtime(path)
+                except OSError:
+                    mtime = None
+                previous = self._mtimes.setdefault(path, mtime)
+                if previous == mtime:
+                    continue
+
+                if self._is_library_path(path):
+                    logger.info('{0} changed, resetting inference'.format(path))
+                    self.reset()
+                    return
+                del self._mtimes[path]
+                name_cache.pop(names, None)
+                break
+
+
+def _iter_root_contexts(items):
+    """Yield module contexts the given inference objects belong to."""
+    for item in items:
+        if isinstance(item, ValueSet):
+            yield from _iter_root_contexts(item)
+        elif isinstance(item, (HelperValueMixin, AbstractContext,
+                               ContextualizedNode)):
+            yield item.get_root_context()
+        elif (isinstance(item, AbstractNameDefinition) and
+                item.parent_context is not None):
+            yield item.parent_context.get_root_context()
+
+
+def _install_safe_points(inference_state, is_cancelled):
+    def check():
+        if is_cancelled():
+            raise RequestCancelled()
+
+    inference_state.recursion_detector.pushed_nodes = _SafePointList(check)
+    inference_state.execution_recursion_detector = \
+        _SafePointExecutionDetector(inference_state, check)
+
+
+class _SafePointList(list):
+    """Stack of inferred statements, that checks for cancellation."""
+
+    def __init__(self, check):
+        super().__init__()
+        self._check = check
+
+    def append(self, node):
+        super().append(node)
+        # `execution_allowed` pops the node if anything goes wrong
+        self._check()
+
+
+class _SafePointExecutionDetector(ExecutionRecursionDetector):
+    """Function executions detector, that checks for cancellation."""
+
+    def __init__(self, inference_state, check):
+        super().__init__(inference_state)
+        self._check = check
+
+    def push_execution(self, execution):
+        self._check()
+        return super().push_execution(execution)
@@ -1,4 +1,14 @@
+from functools import partial
+
 import sublime
+import sublime_plugin
+
+# tag of settings change callbacks registered by the plugin
+_ON_CHANGE_TAG = 'sublime_jedi'
+
+# snapshots of settings per view id
+_SNAPSHOTS = {}
+_watching_plugin_settings = False
 
 
 def get_plugin_settings():
@@ -14,3 +24,70 @@ def get_settings_param(view, param_name, default=None):
         param_name,
         plugin_settings.get(param_name, default)
     )
+
+
+def get_settings_snapshot(view, build):
+    """Get settings of the view built by ``build(view)``.
+
+    The snapshot is built once and kept until plugin, view or project
+    settings change, so it must not be modified.
+
+    :type view: sublime.View
+    :type build: callable
+    :rtype: dict
+    """
+    view_id = view.id()
+    try:
+        return _SNAPSHOTS[view_id]
+    except KeyError:
+        pass
+
+    _watch_plugin_settings()
+    view_settings = view.settings()
+    view_settings.clear_on_change(_ON_CHANGE_TAG)
+    view_settings.add_on_change(
+        _ON_CHANGE_TAG, partial(forget_settings_snapshot, view_id))
+
+    snapshot = _SNAPSHOTS[view_id] = build(view)
+    return snapshot
+
+
+def forget_settings_snapshot(view_id):
+    _SNAPSHOTS.pop(view_id, None)
+
+
+def unwatch_settings():
+    """Stop tracking settings changes, when the plugin is unloaded."""
+    global _watching_plugin_settings
+    if _watching_plugin_settings:
+        get_plugin_settings().clear_on_change(_ON_CHANGE_TAG)
+        _watching_plugin_settings = False
+    _SNAPSHOTS.clear()
+
+
+def _watch_plugin_settings():
+    global _watching_plugin_settings
+    if not _watching_plugin_settings:
+        get_plugin_settings().add_on_change(_ON_CHANGE_TAG, _SNAPSHOTS.clear)
+        _watching_plugin_settings = True
+
+
+class SettingsListener(sublime_plugin.EventListener):
+    """Drop settings snapshots, which may depend on changed paths."""
+
+    def on_load_project_async(self, window):
+        self._forget_window(window)
+
+    def on_post_save_project_async(self, window):
+        self._forget_window(window)
+
+    def on_post_save_async(self, view):
+        # "$file" could have been changed by "Save As"
+        forget_settings_snapshot(view.id())
+
+    def on_close(self, view):
+        forget_settings_snapshot(view.id())
+
+    def _forget_window(self, window):
+        for view in window.views():
+            forget_settings_snapshot(view.id())
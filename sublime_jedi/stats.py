@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""Request counters and memory usage of the plugin host and workers."""
+import os
+import threading
+import subprocess
+from collections import Counter
+
+import parso.cache
+
+_lock = threading.Lock()
+_counters = Counter()
+
+
+def increment(name, request_type, value=1):
+    """Increase counter of request type.
+
+    :type name: str
+    :type request_type: str
+    """
+    with _lock:
+        _counters[(request_type, name)] += value
+
+
+def snapshot():
+    """Get copy of all counters, with ones of parso's module cache.
+
+    :rtype: dict of ((str, str), int)
+    """
+    with _lock:
+        counters = dict(_counters)
+    parser_cache = parso.cache.get_statistics()
+    counters.update({
+        ('parser cache', 'cache hit'): parser_cache['hits'],
+        ('parser cache', 'cache miss'): parser_cache['misses'],
+        ('parser cache', 'eviction'): parser_cache['evictions'],
+    })
+    return counters
+
+
+def format_counters(counters):
+    """Format counters as a table ordered by request type.
+
+    Hit rates of cached requests are added.
+
+    :type counters: dict of ((str, str), int)
+    :rtype: str
+    """
+    rows = dict(counters)
+    for (request_type, name), hits in counters.items():
+        if name == 'cache hit' and hits:
+            misses = counters.get((request_type, 'cache miss'), 0)
+            rows[(request_type, 'cache hit rate')] = '{0:.0%}'.format(
+                hits / (hits + misses))
+    lines = [
+        '{0:<16} {1:<24} {2}'.format(request_type, name, value)
+        for (request_type, name), value in sorted(rows.items())
+    ]
+    return '\n'.join(lines) or 'no requests'
+
+
+def get_parser_cache_usage():
+    """Get estimated memory of parso's cached modules and its budget.
+
+    :rtype: (int, int)
+    """
+    statistics = parso.cache.get_statistics()
+    return statistics['size'], statistics['budget']
+
+
+def get_memory_usage(pid=None):
+    """Get resident memory of a process in bytes, None if unknown.
+
+    :type pid: int or None
+    :rtype: int or None
+    """
+    pid = pid or os.getpid()
+    try:
+        with open('/proc/{0}/statm'.format(pid)) as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    if os.name == 'nt':
+        return None
+    try:
+        rss = subprocess.check_output(
+            ('ps', '-o', 'rss=', '-p', str(pid)),
+            stderr=subprocess.DEVNULL,
+        )
+        return int(rss) * 1024
+    except (OSError, ValueError, subprocess.CalledProcessError):
+        return None
+
+
+def format_memory(size):
+    """Format memory size in megabytes.
+
+    :type size: int or None
+    :rtype: str
+    """
+    if size is None:
+        return 'unknown'
+    return '{0:.1f} MB'.format(size / 1024 / 1024)
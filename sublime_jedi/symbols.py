@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""Index of definitions in a project, persisted between sessions.
+
+Classes, functions (including methods) and module level assignments of
+every python file of the project are kept with their full names and
+positions under Jedi's cache directory. Files are parsed again only if
+their modification time or size changed.
+"""
+import os
+import re
+import time
+import pickle
+import hashlib
+import logging
+import threading
+from bisect import bisect
+
+import parso
+from parso.utils import python_bytes_to_unicode
+from jedi import settings
+from jedi.file_io import FolderIO
+from jedi.inference.references import recurse_find_python_files
+
+logger = logging.getLogger(__name__)
+
+# bump when the format of indexed symbols changes
+INDEX_VERSION = 1
+
+
+class SymbolIndex:
+    """Definitions of a project, updated in a background thread.
+
+    A symbol is ``(name, full name, type, path, line, column)``.
+    """
+
+    # how often (in seconds) updates of single files are saved
+    SAVE_INTERVAL = 60
+    # files larger than this (in bytes) are likely generated, not indexed
+    MAX_FILE_SIZE = 1024 * 1024
+
+    def __init__(self, project_path, cache_path=None, folder_excludes=None,
+                 grammar=None):
+        """
+        :param folder_excludes: folders not to index, besides ignored ones
+        :type folder_excludes: jedi.inference.gitignore.FolderExcludes
+        :param grammar: grammar of the project's Python version, the one of
+            the running interpreter if None
+        :type grammar: parso.Grammar
+        """
+        self.project_path = project_path
+        self.cache_path = cache_path or _get_cache_path(project_path)
+        self.folder_excludes = folder_excludes
+        self._lock = threading.Lock()
+        self._files = None  # path -> (mtime, size, symbols)
+        self._names = None  # see `_get_names`
+        self._queue = []  # paths to update, None for all files
+        self._updating = False
+        self._is_complete = False
+        self._saved_at = 0
+        self._grammar = grammar or parso.load_grammar()
+
+    @property
+    def file_count(self):
+        return len(self._files or ())
+
+    @property
+    def is_complete(self):
+        """All files of the project were indexed at least once."""
+        return self._is_complete
+
+    def update(self, paths=None):
+        """Update index of changed files in background.
+
+        :param paths: files to check, all files of the project if None
+        :type paths: list of str or None
+        """
+        with self._lock:
+            self._queue.append(paths)
+            if self._updating:
+                return
+            self._updating = True
+        thread = threading.Thread(target=self._run_updates)
+        thread.daemon = True
+        thread.start()
+
+    def search(self, query, limit=100):
+        """Find symbols with names fuzzy matching query.
+
+        Symbols, which names start with the query, go first, then shorter
+        names. If the query has dots, full names are matched.
+
+        :type query: str
+        :rtype: list of tuple
+        """
+        query = query.strip()
+        if not query:
+            return []
+        is_full_name = '.' in query
+        with self._lock:
+            if self._files is None:
+                return []
+            names, offsets, symbols = self._get_names(is_full_name)
+
+        lowered = query.lower()
+        # every character is looked for up to its first occurrence, so
+        # there's nothing to backtrack
+        pattern = re.compile(re.escape(lowered[0]) + ''.join(
+            '[^{0}\n]*{0}'.format(re.escape(c)) for c in lowered[1:]))
+        ranked = []
+        last = None
+        for match in pattern.finditer(names):
+            index = bisect(offsets, match.start()) - 1
+            if index == last:
+                continue
+            last = index
+            name = names[offsets[index]:offsets[index + 1] - 1]
+            ranked.append((not name.startswith(lowered), len(name), index))
+        ranked.sort()
+
+        result = []
+        for _, _, index in ranked:
+            result.extend(symbols[index])
+            if len(result) >= limit:
+                break
+        return result[:limit]
+
+    def _get_names(self, is_full_name):
+        """Get lowered names joined by new lines, offsets of the names and
+        symbols per name.
+
+        Regular expressions find matching names in such text much faster,
+        than names are matched one by one.
+        """
+        if self._names is None:
+            self._names = {}
+        try:
+            return self._names[is_full_name]
+        except KeyError:
+            pass
+
+        by_name = {}
+        for _, _, file_symbols in self._files.values():
+            for symbol in file_symbols:
+                name = symbol[1 if is_full_name else 0].lower()
+                by_name.setdefault(name, []).append(symbol)
+        ordered = sorted(by_name)
+        offsets = []
+        offset = 0
+        for name in ordered:
+            offsets.append(offset)
+            offset += len(name) + 1
+        offsets.append(offset)
+        result = (
+            '\n'.join(ordered) + '\n',
+            offsets,
+            [by_name[name] for name in ordered],
+        )
+        self._names[is_full_name] = result
+        return result
+
+    def _run_updates(self):
+        try:
+            if self._files is None:
+                files = self._load()
+                with self._lock:
+                    self._files = files
+                    self._names = None
+            while True:
+                with self._lock:
+                    if not self._queue:
+                        self._updating = False
+                        return
+                    queue, self._queue = self._queue, []
+                if any(paths is None for paths in queue):
+                    self._update_all()
+                else:
+                    self._update_files(set(p for ps in queue for p in ps))
+        except Exception:
+            logger.exception('Indexing {0} failed'.format(self.project_path))
+            with self._lock:
+                self._updating = False
+
+    def _update_all(self):
+        started = time.time()
+        seen = set()
+        changed = 0
+        for file_io in recurse_find_python_files(
+                FolderIO(self.project_path),
+                folder_excludes=self.folder_excludes):
+            if not file_io.path.endswith('.py'):
+                continue
+            seen.add(file_io.path)
+            try:
+                stat = file_io.stat()
+            except OSError:
+                stat = None
+            changed += self._update_file(file_io.path, stat)
+        with self._lock:
+            removed = self._files.keys() - seen
+            for path in removed:
+                del self._files[path]
+            if removed:
+                self._names = None
+        self._is_complete = True
+        logger.info('Indexed {0} files of {1} in {2:.2f}s, {3} changed'.format(
+            len(seen), self.project_path, time.time() - started, changed))
+        if changed or removed:
+            self._save()
+
+    def _update_files(self, paths):
+        for path in paths:
+            if path.endswith('.py') and path.startswith(
+                    os.path.join(self.project_path, '')):
+                self._update_file(path)
+        if time.time() - self._saved_at > self.SAVE_INTERVAL:
+            self._save()
+
+    def _update_file(self, path, stat=None):
+        """Index the file again if it changed.
+
+        :param stat: stat of the file, if it's known already
+        :rtype: bool
+        """
+        if stat is None:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                pass
+        with self._lock:
+            indexed = self._files.get(path)
+        if stat is None:
+            if indexed is None:
+                return False
+            with self._lock:
+                self._files.pop(path, None)
+                self._names = None
+            return True
+        if indexed is not None and indexed[:2] == (stat.st_mtime,
+                                                   stat.st_size):
+            return False
+
+        symbols = []
+        if stat.st_size <= self.MAX_FILE_SIZE:
+            try:
+                symbols = self._parse(path)
+            except Exception:
+                logger.debug('Failed to index {0}'.format(path), exc_info=True)
+        with self._lock:
+            self._files[path] = stat.st_mtime, stat.st_size, symbols
+            self._names = None
+        return True
+
+    def _parse(self, path):
+        with open(path, 'rb') as f:
+            code = python_bytes_to_unicode(f.read(), errors='replace')
+        module = self._grammar.parse(code, cache=False)
+        return list(_iter_symbols(
+            module, path, _get_module_name(self.project_path, path)))
+
+    def _load(self):
+        try:
+            with open(self.cache_path, 'rb') as f:
+                version, project_path, files = pickle.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception:
+            logger.exception('Failed to load {0}'.format(self.cache_path))
+            return {}
+        if version != INDEX_VERSION or project_path != self.project_path:
+            return {}
+        return files
+
+    def _save(self):
+        with self._lock:
+            files = dict(self._files)
+        self._saved_at = time.time()
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temporary = '{0}.{1}'.format(self.cache_path, os.getpid())
+            with open(temporary, 'wb') as f:
+                pickle.dump(
+                    (INDEX_VERSION, self.project_path, files), f,
+                    pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary, self.cache_path)
+        except OSError:
+            logger.exception('Failed to save {0}'.format(self.cache_path))
+
+
+def _get_cache_path(project_path):
+    key = hashlib.sha1(project_path.encode('utf-8', 'replace')).hexdigest()
+    return os.path.join(
+        settings.cache_directory, 'sublime_jedi', 'symbols', key + '.pickle')
+
+
+def _get_module_name(project_path, path):
+    relative = os.path.relpath(path, project_path)
+    parts = os.path.splitext(relative)[0].split(os.sep)
+    if parts[-1] == '__init__':
+        parts.pop()
+    return '.'.join(parts)
+
+
+def _iter_symbols(module, path, module_name):
+    """Yield definitions of classes and module level."""
+    for node, prefix in _iter_definitions(module, module_name):
+        if node.type in ('classdef', 'funcdef'):
+            name = node.name
+            yield (
+                name.value,
+                prefix + '.' + name.value if prefix else name.value,
+                'class' if node.type == 'classdef' else 'function',
+                path,
+                name.line,
+                name.column,
+            )
+        else:
+            for name in node.get_defined_names():
+                yield (
+                    name.value,
+                    prefix + '.' + name.value if prefix else name.value,
+                    'statement',
+                    path,
+                    name.line,
+                    name.column,
+                )
+
+
+def _iter_definitions(scope, prefix):
+    for node in _iter_scope_nodes(scope):
+        if node.type in ('classdef', 'funcdef'):
+            yield node, prefix
+            if node.type == 'classdef':
+                name = node.name.value
+                yield from _iter_definitions(
+                    node, prefix + '.' + name if prefix else name)
+        elif node.type == 'expr_stmt' and scope.type == 'file_input':
+            yield node, prefix
+
+
+def _iter_scope_nodes(scope):
+    """Yield statements of the scope body, including ones nested in
+    compound statements (like ``if`` and ``try``), but not in scopes."""
+    if scope.type == 'file_input':
+        return _iter_statements(scope.children)
+    body = scope.children[-1]
+    return _iter_statements(body.children if body.type == 'suite' else [body])
+
+
+def _iter_statements(nodes):
+    for node in nodes:
+        while node.type in ('decorated', 'async_stmt', 'async_funcdef'):
+            node = node.children[-1]
+        if node.type == 'simple_stmt':
+            yield from node.children
+        elif node.type in ('classdef', 'funcdef'):
+            yield node
+        elif node.type in ('if_stmt', 'try_stmt', 'with_stmt', 'for_stmt',
+                           'while_stmt'):
+            yield from _iter_statements(
+                child for child in node.children
+                if child.type in ('suite', 'simple_stmt'))
+        elif node.type == 'suite':
+            yield from _iter_statements(node.children)
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""Completions found without inference.
+
+They are names defined in scopes visible at the position, keywords and
+builtins, good enough to show something while Jedi is still inferring.
+"""
+import builtins
+import keyword
+
+from parso.tree import search_ancestor
+
+from .local_usages import get_scope
+
+_TYPES = {
+    'funcdef': 'function',
+    'classdef': 'class',
+    'param': 'param',
+    'import_name': 'module',
+    'import_from': 'module',
+    'dotted_as_name': 'module',
+    'import_as_name': 'module',
+}
+
+
+def complete_syntactically(module_node, position):
+    """Get completions at position from the parsed module only.
+
+    Nothing can be said about attributes and imported modules without
+    inference, so there are no completions after a dot or in imports.
+
+    :type module_node: parso.python.tree.Module
+    :type position: (int, int)
+    :rtype: list of (str, str)
+    """
+    leaf = module_node.get_leaf_for_position(position, include_prefixes=True)
+    if leaf is not None and leaf.start_pos >= position:
+        leaf = leaf.get_previous_leaf()
+    before = leaf
+    if before is not None and before.type == 'name' and (
+            before.end_pos == position):
+        # the name being typed
+        before = before.get_previous_leaf()
+    if before is not None and (
+            before.value == '.' or
+            search_ancestor(before, 'import_name', 'import_from') is not None):
+        return []
+
+    visible = set()
+    scope = get_scope(leaf) if leaf is not None else module_node
+    if leaf is None or leaf.type == 'newline' or leaf.end_pos[0] < position[0]:
+        # at the indentation of a new line, dedented blocks are left
+        while scope is not module_node and scope.start_pos[1] >= position[1]:
+            scope = get_scope(scope)
+    while True:
+        visible.add(scope)
+        if scope is module_node:
+            break
+        scope = get_scope(scope)
+
+    completions = []
+    seen = set()
+    for names in module_node.get_used_names().values():
+        for name in names:
+            if (name.value in seen or name.start_pos >= position and
+                    name.parent.type not in ('funcdef', 'classdef')):
+                continue
+            if not name.is_definition() or get_scope(name) not in visible:
+                continue
+            seen.add(name.value)
+            completions.append(
+                (name.value, _TYPES.get(name.parent.type, 'statement')))
+
+    completions.sort()
+    completions.extend(
+        (name, 'keyword') for name in keyword.kwlist if name not in seen)
+    seen.update(keyword.kwlist)
+    completions.extend(
+        (name, _get_builtin_type(name))
+        for name in dir(builtins)
+        if name not in seen and not name.startswith('_')
+    )
+    return [(name + '\t' + type_, name) for name, type_ in completions]
+
+
+def _get_builtin_type(name):
+    obj = getattr(builtins, name)
+    if isinstance(obj, type):
+        return 'class'
+    if callable(obj):
+        return 'function'
+    return 'instance'
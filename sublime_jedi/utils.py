@@ -7,8 +7,11 @@ from threading import Timer
 
 import sublime
 
+from .common import unique  # noqa
 from .console_logging import getLogger
-from .settings import get_settings_param
+from .settings import (
+    get_plugin_settings, get_settings_param, get_settings_snapshot
+)
 
 logger = getLogger(__name__)
 
@@ -16,9 +19,16 @@ logger = getLogger(__name__)
 def get_settings(view):
     """Get plugin settings.
 
+    Settings are read and their paths are expanded once per view, then the
+    snapshot is reused until settings change. It must not be modified.
+
     :type view: sublime.View
     :rtype: dict
     """
+    return get_settings_snapshot(view, _read_settings)
+
+
+def _read_settings(view):
     python_virtualenv = get_settings_param(view, 'python_virtualenv', None)
     if python_virtualenv:
         python_virtualenv = expand_path(view, python_virtualenv)
@@ -42,6 +52,11 @@ def get_settings(view):
     only_complete_after_regex = get_settings_param(
         view, 'only_complete_after_regex', '')
 
+    # folders hidden by Sublime Text are not searched either
+    folder_exclude_patterns = (
+        list(view.settings().get('folder_exclude_patterns') or []) +
+        list(get_plugin_settings().get('folder_exclude_patterns') or []))
+
     first_folder = ''
     if view.window().folders():
         first_folder = os.path.split(view.window().folders()[0])[-1]
@@ -51,13 +66,31 @@ def get_settings(view):
         'python_interpreter': python_interpreter,
         'python_virtualenv': python_virtualenv,
         'extra_packages': extra_packages,
+        'folder_exclude_patterns': folder_exclude_patterns,
         'project_name': project_name,
         'complete_funcargs': complete_funcargs,
         'enable_in_sublime_repl': enable_in_sublime_repl,
         'sublime_completions_visibility': sublime_completions_visibility,
         'follow_imports': get_settings_param(view, 'follow_imports', True),
-        'completion_timeout': get_settings_param(view, 'comletion_timeout', 3),
+        'completion_timeout': get_settings_param(
+            view, 'completion_timeout', 3),
+        'completion_partial_first': get_settings_param(
+            view, 'completion_partial_first', True),
         'only_complete_after_regex': only_complete_after_regex,
+        'completion_prefetch': get_settings_param(
+            view, 'completion_prefetch', True),
+        'usages_file_limit': get_settings_param(
+            view, 'usages_file_limit', 100),
+        'parser_cache_budget': get_settings_param(
+            view, 'parser_cache_budget', 512),
+        'parser_cache_prewarm': get_settings_param(
+            view, 'parser_cache_prewarm', False),
+        'highlight_usages_on_select': get_settings_param(
+            view, 'highlight_usages_on_select', False),
+        'highlight_usages_color': get_settings_param(
+            view, 'highlight_usages_color'),
+        'project_symbol_index': get_settings_param(
+            view, 'project_symbol_index', True),
     }
 
 
@@ -204,17 +237,6 @@ def is_sublime_v2():
     return sublime.version().startswith('2')
 
 
-def unique(items, pred=lambda x: x):
-    stack = set()
-
-    for i in items:
-        calculated = pred(i)
-        if calculated in stack:
-            continue
-        stack.add(calculated)
-        yield i
-
-
 def debounce(wait):
     def decorator(fn):
         def debounced(*args, **kwargs):
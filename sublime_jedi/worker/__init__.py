@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+"""Jedi worker process.
+
+Serves requests of the plugin, see ``sublime_jedi.protocol``. It is started
+by ``sublime_jedi.pool`` with ``__main__.py`` of this package as a script.
+"""
+import os
+import sys
+import logging
+import threading
+import traceback
+from queue import Queue
+
+from jedi import settings
+
+from .. import stats
+from ..document import DocumentOutOfSync
+from ..engine import Engine
+from ..protocol import (
+    read_frame, write_frame, Generations, STATUS_OK, STATUS_ERROR,
+    STATUS_CANCELLED, STATUS_PARTIAL, STATUS_OUT_OF_SYNC, STATUS_UNAVAILABLE
+)
+from ..session import RequestCancelled
+
+logger = logging.getLogger(__name__)
+
+
+class EngineUnavailable(Exception):
+    """Engine of the project can't be created in this worker."""
+
+
+class Worker:
+    """Request loop of the worker process.
+
+    Requests are read on a separate thread, so the worker learns about
+    newer requests while Jedi is busy. A request is identified by a key
+    (view id and request type) and a generation. Queued requests of an
+    older generation are dropped, and the running one is interrupted at
+    the next inference safe point. Speculative requests give way to any
+    regular one.
+
+    Requests may push a partial answer known without inference first, or
+    give it as the answer when their deadline passes.
+    """
+
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._engines = {}  # project path -> (settings, Engine)
+        self._queue = Queue()
+        self._generations = Generations()
+        self._request_id = None
+
+    def serve_forever(self):
+        reader = threading.Thread(target=self._read_requests)
+        reader.daemon = True
+        reader.start()
+
+        while True:
+            request = self._queue.get()
+            if request is None:
+                logger.info('Plugin host has gone, exiting.')
+                return
+
+            request_id, method, args = request
+            self._request_id = request_id
+            try:
+                payload = getattr(self, 'handle_' + method)(*args)
+                status = STATUS_OK
+            except RequestCancelled:
+                payload = None
+                status = STATUS_CANCELLED
+            except EngineUnavailable:
+                logger.exception('`{0}` failed'.format(method))
+                payload = traceback.format_exc()
+                status = STATUS_UNAVAILABLE
+            except DocumentOutOfSync as e:
+                # e.g. the document was evicted or the engine rebuilt
+                payload = str(e)
+                status = STATUS_OUT_OF_SYNC
+            except Exception:
+                logger.exception('`{0}` failed'.format(method))
+                payload = traceback.format_exc()
+                status = STATUS_ERROR
+
+            write_frame(self._writer, (request_id, status, payload))
+
+    def _read_requests(self):
+        while True:
+            try:
+                request = read_frame(self._reader)
+            except EOFError:
+                self._queue.put(None)
+                return
+
+            _, method, args = request
+            if method == 'request':
+                self._generations.register(*args[:2])
+            self._queue.put(request)
+
+    def handle_request(self, key, generation, project_path, settings,
+                       request_type, request_kwargs, filename, buffer_id,
+                       document, line, column, deadline=None,
+                       partial_first=False):
+        engine = self._get_engine(project_path, settings)
+        # edits must be applied even if the request is dropped, the next
+        # request is based on them
+        source, diff = engine.sync_document(buffer_id, document)
+        if self._generations.is_superseded(key, generation):
+            stats.increment('dropped', request_type)
+            raise RequestCancelled()
+
+        try:
+            answer = engine.request(
+                request_type, request_kwargs, filename, source, line, column,
+                is_cancelled=self._generations.get_cancellation_check(
+                    key, generation),
+                diff=diff,
+                deadline=deadline,
+                on_partial=self._send_partial if partial_first else None,
+            )
+        except RequestCancelled:
+            stats.increment('cancelled', request_type)
+            raise
+        stats.increment('completed', request_type)
+        return answer
+
+    def _send_partial(self, payload):
+        write_frame(self._writer, (self._request_id, STATUS_PARTIAL, payload))
+
+    def handle_index_symbols(self, project_path, settings, paths):
+        self._get_engine(project_path, settings).index_symbols(paths)
+
+    def handle_search_symbols(self, project_path, settings, query, limit):
+        return self._get_engine(project_path, settings).search_symbols(
+            query, limit)
+
+    def handle_prewarm_cache(self, project_path, settings, mode):
+        self._get_engine(project_path, settings).prewarm_cache(mode)
+
+    def handle_prewarm_progress(self, project_path, settings):
+        return self._get_engine(project_path, settings).prewarm_progress()
+
+    def handle_stats(self):
+        return stats.snapshot()
+
+    def handle_release(self, project_path):
+        """Close engine of the project, which the plugin doesn't use."""
+        try:
+            _, engine = self._engines.pop(project_path)
+        except KeyError:
+            return
+        engine.close()
+
+    def handle_status(self):
+        return {
+            'pid': os.getpid(),
+            'memory': stats.get_memory_usage(),
+            'parser_cache': stats.get_parser_cache_usage(),
+            'engines': {
+                project_path: engine.status()
+                for project_path, (_, engine) in self._engines.items()
+            },
+        }
+
+    def _get_engine(self, project_path, settings):
+        try:
+            engine_settings, engine = self._engines[project_path]
+            if engine_settings == settings:
+                return engine
+            del self._engines[project_path]
+            engine.close()
+        except KeyError:
+            pass
+        try:
+            engine = Engine(project_path, settings)
+        except Exception as e:
+            raise EngineUnavailable(
+                'Failed to create engine of {0}: {1!r}'.format(
+                    project_path, e))
+        self._engines[project_path] = settings, engine
+        return engine
+
+
+def main():
+    reader = sys.stdin.buffer
+    writer = sys.stdout.buffer
+    # nothing but protocol frames may be written to stdout
+    sys.stdout = sys.stderr
+
+    logging.basicConfig(
+        stream=sys.stderr,
+        level=logging.WARNING,
+        format='%(name)s: %(message)s',
+    )
+    # only a worker runs a real interpreter, which can start processes
+    # parsing files for usages searches and warming the cache
+    if len(sys.argv) > 1:
+        settings.parse_processes = int(sys.argv[1])
+    Worker(reader, writer).serve_forever()
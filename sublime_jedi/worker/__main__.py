@@ -0,0 +1,23 @@
+import os
+import sys
+import types
+
+_d = os.path.dirname
+_package_path = _d(_d(os.path.abspath(__file__)))
+
+# Remove the first entry, because it's simply a directory entry that equals
+# this directory.
+del sys.path[0]
+sys.path.insert(0, os.path.join(_d(_package_path), 'dependencies'))
+
+# `sublime_jedi/__init__.py` imports Sublime Text commands, so register
+# the package without executing it. Worker modules don't use Sublime API.
+_package = types.ModuleType('sublime_jedi')
+_package.__path__ = [_package_path]
+sys.modules['sublime_jedi'] = _package
+
+from sublime_jedi.worker import main  # noqa: E402
+
+# processes parsing files may import this module again (as __mp_main__)
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+import sys
+import unittest
+
+completion = sys.modules["Jedi - Python autocompletion.sublime_jedi.completion"]
+
+COMPLETIONS = [
+    ('path\tmodule', 'path'),
+    ('pardir\tinstance', 'pardir'),
+    ('PathLike\tclass', 'PathLike'),
+    ('getpid\tfunction', 'getpid'),
+    ('sep\tinstance', 'sep'),
+]
+
+
+class NarrowCompletionsTestCase(unittest.TestCase):
+
+    def test_prefix_matches_go_first(self):
+        self.assertEqual(
+            [insert for _, insert in
+             completion.narrow_completions(COMPLETIONS, 'pa')],
+            ['path', 'pardir', 'PathLike'],
+        )
+
+    def test_fuzzy_matches(self):
+        self.assertEqual(
+            [insert for _, insert in
+             completion.narrow_completions(COMPLETIONS, 'pid')],
+            ['getpid'],
+        )
+
+    def test_nothing_typed(self):
+        self.assertEqual(
+            completion.narrow_completions(COMPLETIONS, ''), COMPLETIONS)
@@ -0,0 +1,67 @@
+import sys
+import unittest
+
+document = sys.modules["Jedi - Python autocompletion.sublime_jedi.document"]
+
+SOURCE = 'import os\n\ndef a(a1):\n    return a1\n'
+
+
+class DocumentTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.doc = document.Document()
+        self.doc.update(('full', 1, SOURCE))
+
+    def _edit(self, edits, expected):
+        diff = self.doc.update(('edits', 1, 2, edits, len(expected)))
+        self.assertEqual(self.doc.text, expected)
+        self.assertEqual(self.doc.version, 2)
+        return diff
+
+    def test_insert_in_a_row(self):
+        _, _, opcodes = self._edit(
+            [(3, 13, 3, 13, ' + 1')],
+            'import os\n\ndef a(a1):\n    return a1 + 1\n',
+        )
+        self.assertEqual(opcodes, [
+            ('equal', 0, 3, 0, 3),
+            ('replace', 3, 4, 3, 4),
+            ('equal', 4, 5, 4, 5),
+        ])
+
+    def test_insert_rows(self):
+        _, _, opcodes = self._edit(
+            [(1, 0, 1, 0, 'x = 1\n')],
+            'import os\nx = 1\n\ndef a(a1):\n    return a1\n',
+        )
+        self.assertEqual(opcodes, [
+            ('equal', 0, 1, 0, 1),
+            ('replace', 1, 2, 1, 3),
+            ('equal', 2, 5, 3, 6),
+        ])
+
+    def test_sequential_edits(self):
+        old_rows, rows, opcodes = self._edit(
+            [(0, 0, 2, 0, ''), (1, 4, 1, 13, 'pass')],
+            'def a(a1):\n    pass\n',
+        )
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                self.assertEqual(old_rows[i1:i2], rows[j1:j2])
+        self.assertEqual(opcodes[-1][2:], (len(old_rows), 2, len(rows)))
+
+    def test_irregular_line_breaks(self):
+        diff = self._edit(
+            [(1, 0, 1, 0, '\f')],
+            'import os\n\f\ndef a(a1):\n    return a1\n',
+        )
+        self.assertIsNone(diff)
+
+    def test_edits_of_unknown_version(self):
+        with self.assertRaises(document.DocumentOutOfSync):
+            self.doc.update(('edits', 5, 6, [(0, 0, 0, 0, 'x')], 0))
+
+    def test_edits_of_wrong_size(self):
+        with self.assertRaises(document.DocumentOutOfSync):
+            self.doc.update(('edits', 1, 2, [(0, 0, 0, 0, 'x')], 0))
+        self.assertEqual(self.doc.text, SOURCE)
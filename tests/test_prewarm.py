@@ -0,0 +1,77 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+prewarm = sys.modules["Jedi - Python autocompletion.sublime_jedi.prewarm"]
+
+
+class RecordingWarmer(prewarm.CacheWarmer):
+    """Records files to parse instead of parsing them in processes."""
+
+    THROTTLE = 0
+
+    def _parse(self, paths):
+        self.parsed.extend(
+            os.path.relpath(path, self.root) for path in paths)
+        return True
+
+
+class CacheWarmerTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self._write('project/app.py', 'import libb\nfrom liba import x\n')
+        self._write('project/views.py', 'from liba.sub import y\n')
+        self._write('site/liba/__init__.py', 'import libc.core, os\n')
+        self._write('site/liba/sub.py', 'from . import x\n')
+        self._write('site/liba/tests/test_sub.py', 'import unused\n')
+        self._write('site/libb.py', '')
+        self._write('site/libc/__init__.pyi', '')
+        self._write('site/libc/core.py', '')
+        self._write('site/unused/__init__.py', '')
+
+    def tearDown(self):
+        shutil.rmtree(self.root)
+
+    def _write(self, path, code):
+        path = os.path.join(self.root, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(code)
+
+    def _warm(self, mode='imports'):
+        project = os.path.join(self.root, 'project')
+        warmer = RecordingWarmer(
+            project,
+            [project, os.path.join(self.root, 'site')],
+            None,
+            None,
+            mode=mode,
+            cache_path=os.path.join(self.root, 'state.pickle'),
+        )
+        warmer.root = os.path.join(self.root, 'site')
+        warmer.parsed = []
+        warmer.start()
+        warmer._thread.join(10)
+        self.assertIsNone(warmer.progress())
+        return warmer.parsed
+
+    def test_project_imports_first(self):
+        self.assertEqual(self._warm(), [
+            'liba/__init__.py',
+            'liba/sub.py',
+            'libb.py',
+            'libc/__init__.pyi',
+            'libc/core.py',
+        ])
+
+    def test_all(self):
+        self.assertEqual(self._warm('all')[-1], 'unused/__init__.py')
+
+    def test_resume(self):
+        self._warm()
+        self.assertEqual(self._warm(), [])
+        self._write('site/libb.py', 'changed = True\n')
+        self.assertEqual(self._warm(), ['libb.py'])
@@ -0,0 +1,36 @@
+import sys
+import unittest
+
+results = sys.modules["Jedi - Python autocompletion.sublime_jedi.results"]
+
+
+class ResultCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = results.ResultCache(max_buffers=2, max_answers=2)
+
+    def test_answers_of_the_same_version(self):
+        self.cache.put(1, 10, ('goto', (0, 3)), [('a.py', 1, 1)])
+        self.assertEqual(
+            self.cache.get(1, 10, ('goto', (0, 3))), [('a.py', 1, 1)])
+        self.assertIsNone(self.cache.get(1, 10, ('docstring', (0, 3))))
+        self.assertIsNone(self.cache.get(2, 10, ('goto', (0, 3))))
+
+    def test_new_version_drops_answers(self):
+        self.cache.put(1, 10, 'key', 'answer')
+        self.assertIsNone(self.cache.get(1, 11, 'key'))
+        self.assertIsNone(self.cache.get(1, 10, 'key'))
+
+    def test_least_recently_used_answers_are_evicted(self):
+        self.cache.put(1, 10, 'a', 'A')
+        self.cache.put(1, 10, 'b', 'B')
+        self.cache.get(1, 10, 'a')
+        self.cache.put(1, 10, 'c', 'C')
+        self.assertEqual(self.cache.get(1, 10, 'a'), 'A')
+        self.assertIsNone(self.cache.get(1, 10, 'b'))
+
+    def test_least_recently_used_buffers_are_evicted(self):
+        for buffer_id in (1, 2, 3):
+            self.cache.put(buffer_id, 10, 'key', buffer_id)
+        self.assertIsNone(self.cache.get(1, 10, 'key'))
+        self.assertEqual(self.cache.get(3, 10, 'key'), 3)
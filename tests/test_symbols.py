@@ -0,0 +1,110 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import parso
+from jedi.inference.gitignore import FolderExcludes
+
+symbols = sys.modules["Jedi - Python autocompletion.sublime_jedi.symbols"]
+
+SOURCE = '''import os
+
+CONSTANT, OTHER = 1, 2
+
+if os.name == 'nt':
+    def platform_specific():
+        pass
+
+
+class Model:
+    table = 'models'
+
+    @property
+    def objects(self):
+        def helper():
+            pass
+
+    class Meta:
+        pass
+'''
+
+
+class SymbolIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.project = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.project, 'app'))
+        self.path = os.path.join(self.project, 'app', 'models.py')
+        with open(self.path, 'w') as f:
+            f.write(SOURCE)
+        self.index = symbols.SymbolIndex(
+            self.project, os.path.join(self.project, '.index'))
+
+    def tearDown(self):
+        shutil.rmtree(self.project)
+
+    def _update(self, index, paths=None):
+        index.update(paths)
+        while index._updating:
+            time.sleep(0.01)
+
+    def _search(self, query, index=None):
+        return [s[1] for s in (index or self.index).search(query)]
+
+    def test_definitions(self):
+        self._update(self.index)
+        self.assertTrue(self.index.is_complete)
+        self.assertEqual(sorted(self._search('app.models.')), [
+            'app.models.CONSTANT',
+            'app.models.Model',
+            'app.models.Model.Meta',
+            'app.models.Model.objects',
+            'app.models.OTHER',
+            'app.models.platform_specific',
+        ])
+
+    def test_fuzzy_names_starting_with_query_first(self):
+        self._update(self.index)
+        self.assertEqual(self._search('mo'), ['app.models.Model'])
+        self.assertEqual(
+            self._search('ot'),
+            ['app.models.OTHER', 'app.models.Model.objects',
+             'app.models.CONSTANT'])
+
+    def test_persisted_and_updated(self):
+        self._update(self.index)
+        with open(self.path, 'a') as f:
+            f.write('\ndef added():\n    pass\n')
+        self._update(self.index, [self.path])
+        self.assertEqual(self._search('added'), ['app.models.added'])
+
+        self.index._save()
+        index = symbols.SymbolIndex(self.project, self.index.cache_path)
+        self._update(index, [])
+        self.assertEqual(self._search('added', index), ['app.models.added'])
+
+    def test_parsed_with_grammar_of_project(self):
+        with open(self.path, 'w') as f:
+            f.write('def pair((a, b)):\n    print a\n')
+        index = symbols.SymbolIndex(
+            self.project, self.index.cache_path,
+            grammar=parso.load_grammar(version='2.7'))
+        self._update(index)
+        self.assertEqual(self._search('pair', index), ['app.models.pair'])
+
+    def test_ignored_folders_not_indexed(self):
+        for folder in ('build', 'vendor', 'app/generated'):
+            os.makedirs(os.path.join(self.project, folder))
+            with open(os.path.join(self.project, folder, 'm.py'), 'w') as f:
+                f.write('def ignored():\n    pass\n')
+        with open(os.path.join(self.project, '.gitignore'), 'w') as f:
+            f.write('build/\n')
+        with open(os.path.join(self.project, 'app', '.gitignore'), 'w') as f:
+            f.write('/gen*\n')
+        self.index.folder_excludes = FolderExcludes(['vendor'])
+        self._update(self.index)
+        self.assertEqual(self._search('ignored'), [])
+        self.assertEqual(self._search('Model'), ['app.models.Model'])
@@ -0,0 +1,77 @@
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+
+import parso
+
+syntactic = sys.modules["Jedi - Python autocompletion.sublime_jedi.syntactic"]
+
+SOURCE = '''import os
+
+class Foo:
+    attr = 1
+
+def bar(x):
+    y = x
+    
+'''
+
+
+class CompleteSyntacticallyTestCase(unittest.TestCase):
+
+    def _complete(self, source, position):
+        module = parso.parse(source)
+        return [
+            display for display, _ in
+            syntactic.complete_syntactically(module, position)
+        ]
+
+    def test_names_in_scope(self):
+        completions = self._complete(SOURCE, (8, 4))
+        for name in ('os\tmodule', 'Foo\tclass', 'bar\tfunction',
+                     'x\tparam', 'y\tstatement', 'return\tkeyword',
+                     'len\tfunction'):
+            self.assertIn(name, completions)
+        # class body isn't visible in functions
+        self.assertNotIn('attr\tstatement', completions)
+
+    def test_names_of_other_functions_are_not_visible(self):
+        completions = self._complete(SOURCE + 'z = 1\n', (10, 0))
+        self.assertIn('z\tstatement', completions)
+        self.assertNotIn('y\tstatement', completions)
+
+    def test_nothing_after_dot(self):
+        self.assertEqual(self._complete(SOURCE + 'os.pa', (9, 5)), [])
+
+    def test_nothing_in_imports(self):
+        self.assertEqual(self._complete('from os import pa', (1, 17)), [])
+
+
+class DeadlineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        engine = sys.modules["Jedi - Python autocompletion.sublime_jedi.engine"]
+        self.project = tempfile.mkdtemp()
+        self.engine = engine.Engine(self.project, {})
+
+    def tearDown(self):
+        self.engine.close()
+        shutil.rmtree(self.project)
+
+    def _request(self, **kwargs):
+        return self.engine.request(
+            'autocomplete', {}, None, 'foo = 1\nfo', 1, 2, **kwargs)
+
+    def test_partial_answer_after_deadline(self):
+        answer = self._request(deadline=time.time() - 1)
+        self.assertIn(('foo\tstatement', 'foo'), answer)
+        self.assertNotEqual(answer, self._request())
+
+    def test_pushed_partial_answer_is_final_after_deadline(self):
+        pushed = []
+        answer = self._request(
+            deadline=time.time() - 1, on_partial=pushed.append)
+        self.assertEqual(pushed, [answer])
+        self.assertNotEqual(answer, self._request())